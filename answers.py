@@ -0,0 +1,83 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Google Forms joins the ticked checkboxes of a response with ", "
+DELIMITER = ", "
+
+
+class AnswerParser:
+    # Splits multi-select responses into exact options. Options may contain
+    # the delimiter themselves ("Legal issues (documentation, residency
+    # permits, etc.)"), so the longest run of pieces that forms a known
+    # option wins. Pieces that match nothing are free text typed into
+    # "Other"; they are counted under the question's Other option.
+    def __init__(self, option_list, delimiter=DELIMITER):
+        self.options = list(option_list)
+        self.delimiter = delimiter
+        # Integer code of each option: its position in the option list
+        self.codes = {option: code for code, option in enumerate(self.options)}
+        self.max_pieces = max(option.count(delimiter) for option in self.options) + 1
+        self.other = next((option for option in self.options if option.startswith("Other")), None)
+
+    def parse(self, response):
+        # Returns (matched options, free-text answers)
+        pieces = str(response).split(self.delimiter)
+        matched, free_text, pending = [], [], []
+        i = 0
+        while i < len(pieces):
+            for span in range(min(self.max_pieces, len(pieces) - i), 0, -1):
+                candidate = self.delimiter.join(pieces[i:i + span]).strip()
+                if candidate in self.codes:
+                    break
+            else:
+                # Consecutive unmatched pieces are one write-in containing commas
+                pending.append(pieces[i])
+                i += 1
+                continue
+            if pending:
+                free_text.append(self.delimiter.join(pending).strip())
+                pending = []
+            matched.append(candidate)
+            i += span
+        if pending:
+            free_text.append(self.delimiter.join(pending).strip())
+        return list(dict.fromkeys(matched)), [text for text in free_text if text]
+
+    def with_other(self, matched, free_text):
+        if free_text and self.other is not None and self.other not in matched:
+            return matched + [self.other]
+        return matched
+
+    def options_for(self, response):
+        return self.with_other(*self.parse(response))
+
+    def codes_for(self, response):
+        return [self.codes[option] for option in self.options_for(response)]
+
+    def count(self, responses, weights):
+        # Respondents per option over distinct responses, weighted by how
+        # often each response occurs. attrs["write_ins"] holds the number of
+        # distinct free-text answers, for questions with an Other option.
+        counts = np.zeros(len(self.options), dtype="int64")
+        write_ins = set()
+        for response, weight in zip(responses, weights):
+            matched, free_text = self.parse(response)
+            for option in self.with_other(matched, free_text):
+                counts[self.codes[option]] += int(weight)
+            write_ins.update(free_text)
+        result = pd.Series(counts, index=self.options)
+        if self.other is not None:
+            result.attrs["write_ins"] = len(write_ins)
+        return result
+
+
+@lru_cache(maxsize=None)
+def _parser(options):
+    return AnswerParser(options)
+
+
+def parser_for(option_list):
+    # One compiled parser per question, reused across reruns
+    return _parser(tuple(option_list))
@@ -0,0 +1,236 @@
+"""Performance budgets for the dashboard's data work.
+
+Times every stage of a page run (loading, filter index, summary, each chart,
+validation, trends, drill-down index, estimates, subgroup comparison) and
+its peak memory on synthetic sheets generated from schema.json, and compares
+them with a stored baseline. A stage is over budget when it takes longer,
+or peaks higher, than its baseline plus the tolerance; the check then
+prints the per-stage diff and exits with status 1. A stage without a baseline (a newly added chart)
+also fails, so new questions are added to the baseline on purpose.
+
+Timings depend on the machine: record the baseline where the check runs.
+
+Usage:
+    python budgets.py check
+    python budgets.py record
+    python budgets.py check --rows 10000 --time-tolerance 0.5
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from charts import CHARTS, aggregate_chart, compact_figure, create_chart
+from drilldown import RespondentIndex
+from estimates import chart_estimates
+from schema import load_schema
+from significance import compare_groups
+from survey import categorize, filter_index, summary_stats
+from trends import TIMESTAMP_FORMAT, TrendStore
+from validation import validate
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_baseline.json")
+
+# Synthetic sheet sizes
+ROWS = [10_000, 50_000]
+# Each stage is timed this many times and the fastest run kept
+REPEAT = 5
+
+# Allowed growth over the baseline, relative and absolute (the absolute
+# slack keeps stages of a few milliseconds from failing on noise)
+TIME_TOLERANCE = 0.5
+TIME_SLACK = 0.05
+MEMORY_TOLERANCE = 0.10
+MEMORY_SLACK = 1.0
+
+# Answers of the single-select questions; the others answer Yes/No
+SINGLE_VALUES = {
+    "sex": ["Female", "Male"],
+    "legal_status": ["Temporary protection", "Refugee", "Asylum seeker"],
+    "ethnicity": ["None", "Roma", "Gagauz", "Jewish"],
+    "settlement": ["City", "Village"],
+}
+DEFAULT_VALUES = ["Yes", "No", "Prefer not to say"]
+NUMERIC_VALUES = {"age": (18, 85), "household_size": (1, 8)}
+
+# Distinct responses per multi-select question; sheets repeat a few
+# combinations of options far more often than the rest
+DISTINCT_RESPONSES = 300
+WRITE_INS = ["my own answer", "Help with rent", "help with RENT!", "no idea"]
+
+
+def synthetic_sheet(rows, seed=0):
+    # A sheet with every question of the schema, keyed by question id
+    rng = np.random.default_rng(seed)
+    data = {}
+    for question in load_schema()["questions"]:
+        question_id, kind = question["id"], question["type"]
+        if kind == "timestamp":
+            start = pd.Timestamp("2024-05-01")
+            offsets = np.sort(rng.integers(0, 90 * 24 * 3600, rows))
+            data[question_id] = (start + pd.to_timedelta(offsets, unit="s")).strftime(TIMESTAMP_FORMAT)
+        elif kind == "numeric":
+            low, high = NUMERIC_VALUES.get(question_id, (0, 10))
+            data[question_id] = rng.integers(low, high + 1, rows)
+        elif kind == "multi":
+            options = question["options"]
+            # Free text only where the question has an Other option
+            other = any(option.startswith("Other") for option in options)
+            pool = []
+            for _ in range(DISTINCT_RESPONSES):
+                picked = list(rng.choice(options, size=min(rng.integers(1, 4), len(options)), replace=False))
+                if other and rng.random() < 0.15:
+                    picked.append(str(rng.choice(WRITE_INS)))
+                pool.append(", ".join(picked))
+            ranks = np.arange(1, len(pool) + 1)
+            responses = np.array(pool, dtype=object)[rng.choice(len(pool), rows, p=(1 / ranks) / (1 / ranks).sum())]
+            responses[rng.random(rows) < 0.1] = None
+            data[question_id] = responses
+        elif question_id != "age_group":
+            values = SINGLE_VALUES.get(question_id, DEFAULT_VALUES)
+            data[question_id] = np.array(values, dtype=object)[rng.integers(0, len(values), rows)]
+
+    # Answers that the data-quality checks expect to agree
+    age = data["age"]
+    data["age_group"] = np.where(age < 36, "18-35", np.where(age < 60, "36-59", "60+"))
+    household = data["household_size"]
+    data["children"] = rng.integers(0, household)
+    data["elderly"] = rng.integers(0, household - data["children"])
+    return pd.DataFrame(data)[[question["id"] for question in load_schema()["questions"]]]
+
+
+def stages(raw):
+    # (name, function) for every stage, in the order of a page run
+    df = categorize(raw)
+    steps = [
+        ("categorize", lambda: categorize(raw)),
+        ("filter index", lambda: filter_index(df)),
+        ("summary", lambda: summary_stats(df)),
+    ]
+    for chart in CHARTS:
+        steps.append((f"chart {chart['key']}", lambda chart=chart: build_compact(df, chart)))
+    steps += [
+        ("validation", lambda: validate(df)),
+        ("trends", lambda: TrendStore().update(df)),
+        ("drill-down index", lambda: RespondentIndex().update(df)),
+        ("estimates", lambda: chart_estimates(df, CHARTS, np.ones(len(df)))),
+        ("group comparison", lambda: compare_groups(df, CHARTS, "sex")),
+    ]
+    return steps
+
+
+def build_compact(df, chart):
+    fig = create_chart(chart, aggregate_chart(df, chart))
+    return None if fig is None else compact_figure(fig)
+
+
+def measure(steps, repeat=REPEAT):
+    # Fastest of repeat runs per stage, with garbage collection off as in
+    # timeit, after one untimed run that pays for lazy imports and warm-up;
+    # peak memory from a separate traced run, since tracing slows the stage
+    # down
+    results = {}
+    for name, step in steps:
+        step()
+        seconds = []
+        for _ in range(repeat):
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                step()
+                seconds.append(time.perf_counter() - start)
+            finally:
+                gc.enable()
+        tracemalloc.start()
+        step()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = {"seconds": round(min(seconds), 4), "peak_mb": round(peak / 2**20, 3)}
+    results["total"] = {
+        "seconds": round(sum(result["seconds"] for result in results.values()), 4),
+        "peak_mb": max(result["peak_mb"] for result in results.values()),
+    }
+    return results
+
+
+def run(rows=ROWS, repeat=REPEAT):
+    return {str(n): measure(stages(synthetic_sheet(n)), repeat) for n in rows}
+
+
+def compare(baseline, current, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    # One row per stage and sheet size with the baseline, the current run,
+    # the budget and whether it is exceeded
+    rows = []
+    for size, results in current.items():
+        base = baseline.get(size, {})
+        for stage, result in results.items():
+            row = {
+                "Rows": int(size),
+                "Stage": stage,
+                "Seconds": result["seconds"],
+                "Peak MB": result["peak_mb"],
+            }
+            if stage not in base:
+                rows.append(dict(row, Status="no baseline"))
+                continue
+            row["Base seconds"] = base[stage]["seconds"]
+            row["Base MB"] = base[stage]["peak_mb"]
+            row["Time budget"] = base[stage]["seconds"] * (1 + time_tolerance) + TIME_SLACK
+            row["Memory budget"] = base[stage]["peak_mb"] * (1 + memory_tolerance) + MEMORY_SLACK
+            over = [
+                label
+                for label, value, budget in [
+                    ("time", row["Seconds"], row["Time budget"]),
+                    ("memory", row["Peak MB"], row["Memory budget"]),
+                ]
+                if value > budget
+            ]
+            rows.append(dict(row, Status="over " + " and ".join(over) if over else "ok"))
+    columns = ["Rows", "Stage", "Base seconds", "Seconds", "Time budget", "Base MB", "Peak MB", "Memory budget", "Status"]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the dashboard's timings and memory against budgets.")
+    parser.add_argument("mode", choices=["check", "record"], help="Compare with the baseline, or write it")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument("--rows", type=int, nargs="+", default=ROWS, help="Synthetic sheet sizes")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="Timed runs per stage")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    current = run(args.rows, args.repeat)
+    if args.mode == "record":
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(current)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Recorded {', '.join(current)} rows to {args.baseline}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    report = compare(baseline, current, args.time_tolerance, args.memory_tolerance)
+    failed = report[report["Status"] != "ok"]
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(report.round(3).to_string(index=False))
+    if not failed.empty:
+        print(f"\n{len(failed)} stages over budget or without a baseline:")
+        print(failed.round(3).to_string(index=False))
+        sys.exit(1)
+    print("\nAll stages within budget")
+
+
+if __name__ == "__main__":
+    main()
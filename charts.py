@@ -0,0 +1,846 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from answers import parser_for
+from schema import question_options, question_text
+
+# Figure transport settings
+PAYLOAD_BUDGET_BYTES = 20_000  # Per chart, uncompressed JSON
+FLOAT_DECIMALS = 2
+
+
+def value_counts(df, column_name):
+    counts = df[column_name].value_counts()
+    # Categorical columns also list the categories filtered out of view
+    return counts[counts > 0]
+
+
+def match_options(response, option_list):
+    return parser_for(option_list).options_for(response)
+
+
+def count_options(responses, weights, option_list):
+    # Tally each option over the distinct responses, weighted by how often
+    # each response occurs
+    return parser_for(option_list).count(responses, weights)
+
+
+def option_counts(df, column_name, option_list):
+    response_counts = value_counts(df, column_name)
+    return count_options(response_counts.index, response_counts.values, option_list)
+
+
+def histogram_bins(df, column_name):
+    # Ensure the data is numeric and drop NaN values
+    data = pd.to_numeric(df[column_name], errors="coerce").dropna()
+
+    # Determine the number of bins using Sturges' formula
+    num_bins = int(np.ceil(1 + np.log2(len(data)))) if len(data) else 1
+
+    # Bin on the server so only the bin counts are sent, not every raw value
+    return np.histogram(data, bins=num_bins)
+
+
+def access_table(df):
+    if 'age_group' not in df.columns or \
+       'ethnicity' not in df.columns or \
+       'healthcare_access' not in df.columns:
+        return None
+
+    # Create a subset of the data
+    heatmap_data = df[['age_group', 'ethnicity', 'healthcare_access']]
+
+    # Rename columns for ease
+    heatmap_data = heatmap_data.rename(columns={
+        'age_group': 'Age Group',
+        'ethnicity': 'Ethnicity',
+        'healthcare_access': 'Accessed Healthcare'
+    })
+
+    # Drop rows with missing values in these columns
+    heatmap_data = heatmap_data.dropna(subset=['Age Group', 'Ethnicity', 'Accessed Healthcare'])
+
+    # For each combination of Age Group and Ethnicity, compute the proportion of 'Yes' responses
+    pivot_table = heatmap_data.pivot_table(
+        index='Ethnicity',
+        columns='Age Group',
+        values='Accessed Healthcare',
+        aggfunc=lambda x: (x=='Yes').mean(),
+        observed=True
+    )
+
+    # Because the values are proportions, multiply by 100 to get percentages
+    pivot_table = pivot_table * 100
+
+    return pivot_table
+
+
+def access_counts(df):
+    if 'ethnicity' not in df.columns or \
+       'settlement' not in df.columns or \
+       'healthcare_access' not in df.columns:
+        return None
+
+    # Prepare data
+    facet_data = df[['ethnicity',
+                     'settlement',
+                     'healthcare_access']].dropna()
+    facet_data = facet_data.rename(columns={
+        'ethnicity': 'Ethnicity',
+        'settlement': 'Location',
+        'healthcare_access': 'Accessed Healthcare'
+    })
+
+    # Calculate counts
+    facet_counts = facet_data.groupby(['Location', 'Ethnicity', 'Accessed Healthcare'], observed=True).size().reset_index(name='Count')
+
+    return facet_counts
+
+
+def problem_counts(df):
+    if 'ethnicity' not in df.columns or \
+       'age_group' not in df.columns or \
+       'service_barriers' not in df.columns:
+        return None
+
+    # Prepare data
+    treemap_data = df[['ethnicity',
+                       'age_group',
+                       'service_barriers']].dropna()
+    treemap_data = treemap_data.rename(columns={
+        'ethnicity': 'Ethnicity',
+        'age_group': 'Age Group',
+        'service_barriers': 'Healthcare Problems'
+    })
+
+    # Parse each distinct response once: count the (ethnicity, age group,
+    # response) combinations first and split only those
+    treemap_data = treemap_data.groupby(['Ethnicity', 'Age Group', 'Healthcare Problems'], observed=True).size().reset_index(name='Count')
+
+    # Apply the option parser to the 'Healthcare Problems' column
+    treemap_data['Healthcare_Problems_List'] = treemap_data['Healthcare Problems'].apply(
+        parser_for(question_options("service_barriers")).options_for
+    )
+
+    # Explode the list to have one problem per row
+    treemap_data = treemap_data.explode('Healthcare_Problems_List')
+
+    # Remove rows with empty problems (in case of unmatched problems)
+    treemap_data = treemap_data.dropna(subset=['Healthcare_Problems_List'])
+
+    # Group the data
+    treemap_counts = treemap_data.groupby(['Ethnicity', 'Age Group', 'Healthcare_Problems_List'], observed=True)['Count'].sum().reset_index()
+
+    return treemap_counts
+
+
+def create_sex_distribution_pie_chart(counts, fig_title):
+    labels = counts.index
+    values = counts.values
+
+    # Create the pie chart
+    fig = go.Figure(
+        data=[
+            go.Pie(
+                labels=labels,
+                values=values,
+                hole=0.4,  # Donut chart style
+                textinfo="label+percent+value",  # Shows label, percent, and values
+                insidetextorientation="horizontal",
+            )
+        ]
+    )
+
+    # Update layout for a transparent background and a professional look
+    fig.update_layout(
+        title=fig_title,
+        paper_bgcolor="rgba(0,0,0,0)",  # Transparent background
+        plot_bgcolor="rgba(0,0,0,0)",  # Transparent plot area
+        showlegend=True,
+    )
+
+    return fig
+
+
+def create_bar_chart(count_series, column_name, chart_title):
+    # Sort the category counts for display
+    count_df = count_series.sort_values(ascending=False).reset_index()
+    count_df.columns = [column_name, "Count"]
+
+    # Create the bar chart
+    fig = px.bar(
+        count_df,
+        x=column_name,
+        y="Count",
+        title=chart_title,
+        labels={"Count": "Number of Responses", column_name: "Category"},
+        text="Count",
+    )
+
+    # Update the layout for a professional look
+    fig.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",  # Transparent plot background
+        paper_bgcolor="rgba(0,0,0,0)",  # Transparent paper background
+        font=dict(size=14),  # Font size for text
+        title_font=dict(size=18),  # Font size for the title
+        xaxis_title="Category",  # X-axis title
+        yaxis_title="Number of Responses",  # Y-axis title
+        hovermode="x",  # Hover mode
+        bargap=0.2,  # Gap between bars
+        height=600,  # Increase figure height
+        margin=dict(b=150),  # Increase bottom margin for labels
+    )
+    fig.update_yaxes(range=[0, count_df["Count"].max() * 1.3])
+    # Update the bar trace for a cleaner look
+    fig.update_traces(
+        marker_color="rgba(100, 149, 237, 0.6)",  # 'CornflowerBlue'
+        marker_line_color="rgba(100, 149, 237, 1.0)",  # Bar border color
+        marker_line_width=1.5,  # Bar border width
+        opacity=0.9,  # Bar opacity
+        textposition="outside",  # Position of the text labels
+    )
+
+    # Rotate x-axis labels to prevent overlap
+    fig.update_layout(xaxis_tickangle=-45)
+
+    return fig
+
+
+def create_mbar_chart(counts, bar_title):
+    write_ins = counts.attrs.get("write_ins")
+    if write_ins:
+        bar_title = f"{bar_title}<br><sup>{write_ins} distinct write-in answers counted under Other</sup>"
+
+    # Convert the counts to a DataFrame
+    df_counts = counts.rename_axis("Answer").reset_index(name="Count")
+
+    # Sort data for better visualization
+    df_counts_sorted = df_counts.sort_values("Count", ascending=False)
+
+    # Create the bar chart with a consistent color scheme; a single trace
+    # with per-bar colors instead of one trace per answer keeps the payload small
+    colors = px.colors.sequential.RdBu_r
+    fig = go.Figure(
+        go.Bar(
+            x=df_counts_sorted["Answer"],
+            y=df_counts_sorted["Count"],
+            text=df_counts_sorted["Count"],
+            marker_color=[colors[i % len(colors)] for i in range(len(df_counts_sorted))],
+        )
+    )
+    fig.update_layout(title=bar_title)
+
+    # Customize the chart layout
+    fig.update_layout(
+        xaxis_title="Options",
+        yaxis_title="Count",
+        plot_bgcolor="rgba(0,0,0,0)",  # Transparent background
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="black", size=12),  # Adjust font color and size for readability
+        showlegend=False,  # Hide the legend if not necessary
+        height=600,  # Increase figure height
+        margin=dict(b=150),  # Increase bottom margin for labels
+    )
+
+    # Rotate x-axis labels to prevent overlap
+    fig.update_layout(xaxis_tickangle=-45)
+
+    # Customize bar appearance
+    fig.update_traces(
+        marker_line_color="rgb(8,48,107)",  # Bar border color
+        marker_line_width=1.5,  # Width of the border
+        opacity=0.8,
+        textangle=0,  # Set text angle to 0 for horizontal alignment
+    )
+
+    return fig
+
+
+def create_histogram(bins, column_name, chart_title):
+    counts, edges = bins
+    fig = go.Figure(
+        go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            customdata=np.column_stack([edges[:-1], edges[1:]]),
+            hovertemplate="%{customdata[0]} - %{customdata[1]}<br>Count: %{y}<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        title=chart_title,
+        plot_bgcolor="rgba(0,0,0,0)",  # Transparent background
+        paper_bgcolor="rgba(0,0,0,0)",
+        xaxis_title=column_name,
+        yaxis_title="Count",
+        bargap=0,
+        height=500,
+    )
+    return fig
+
+
+def create_heatmap(pivot_table):
+    # Create the heatmap
+    fig = px.imshow(
+        pivot_table,
+        labels=dict(x="Age Group", y="Ethnicity", color="Percentage of Access"),
+        x=pivot_table.columns,
+        y=pivot_table.index,
+        color_continuous_scale='Viridis',
+        text_auto=True
+    )
+
+    fig.update_layout(
+        title="Heatmap: Correlation Between Age, Ethnicity, and Healthcare Access",
+        xaxis_title="Age Group",
+        yaxis_title="Ethnicity",
+        plot_bgcolor='rgba(0,0,0,0)',  # Transparent background
+        paper_bgcolor='rgba(0,0,0,0)',
+        height=600
+    )
+    return fig
+
+
+def create_facet_chart(facet_counts):
+    # Create the facet grid
+    fig = px.bar(
+        facet_counts,
+        x='Ethnicity',
+        y='Count',
+        color='Accessed Healthcare',
+        facet_col='Location',
+        category_orders={"Location": sorted(facet_counts['Location'].unique())},
+        title='Healthcare Access by Ethnicity and Location',
+        labels={'Count': 'Number of Responses', 'Ethnicity': 'Ethnicity', 'Accessed Healthcare': 'Accessed Healthcare'},
+        barmode='group'
+    )
+
+    fig.update_layout(
+        height=600,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+    return fig
+
+
+def create_treemap(treemap_counts):
+    # Create the treemap
+    fig = px.treemap(
+        treemap_counts,
+        path=['Ethnicity', 'Age Group', 'Healthcare_Problems_List'],
+        values='Count',
+        color='Count',
+        color_continuous_scale='Blues',
+        title='Distribution of Healthcare Problems by Ethnicity and Age Group'
+    )
+
+    fig.update_layout(
+        height=600,
+        margin=dict(t=50, l=25, r=25, b=25),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+
+def create_round_comparison(comparison, chart_title):
+    fig = px.bar(
+        comparison,
+        x="answer",
+        y="share",
+        color="round",
+        barmode="group",
+        text="count",
+        title=chart_title,
+        labels={"answer": "Answer", "share": "% of Respondents", "round": "Round", "count": "Count"},
+    )
+    fig.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",  # Transparent background
+        paper_bgcolor="rgba(0,0,0,0)",
+        height=600,
+        margin=dict(b=150),  # Increase bottom margin for labels
+        xaxis_tickangle=-45,
+    )
+    return fig
+
+
+def create_trend_chart(trend, chart_title):
+    fig = px.line(
+        trend,
+        x="period",
+        y="share",
+        color="answer",
+        markers=True,
+        custom_data=["count", "respondents"],
+        title=chart_title,
+        labels={"period": "Submitted", "share": "% of Respondents", "answer": "Answer"},
+    )
+    # Counts behind each share in the hover label
+    fig.update_traces(
+        hovertemplate="%{x|%d %b %Y}<br>%{y:.1f}% (%{customdata[0]} of %{customdata[1]})"
+    )
+    fig.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",  # Transparent background
+        paper_bgcolor="rgba(0,0,0,0)",
+        height=500,
+    )
+    return fig
+
+
+def compact_figure(fig, decimals=FLOAT_DECIMALS):
+    # Streamlit's frontend applies its own theme, so the full plotly template
+    # embedded in every figure is dropped instead of being sent ~50 times
+    fig.layout.template = go.layout.Template()
+
+    # Limit the precision of float arrays (percentages, bin edges, ...)
+    for trace in fig.data:
+        for attr in ("x", "y", "z", "values", "text", "customdata", "width"):
+            if attr not in trace or trace[attr] is None:
+                continue
+            values = np.asarray(trace[attr])
+            if values.dtype.kind != "f":
+                continue
+            values = np.round(values, decimals)
+            if np.isfinite(values).all() and (values == np.floor(values)).all():
+                values = values.astype(np.int64)
+            trace[attr] = values
+    return fig
+
+
+def figure_to_image(fig, format="webp"):
+    # Static rendering needs the optional kaleido package
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        return None
+    try:
+        return fig.to_image(format=format, scale=1)
+    except Exception:
+        # kaleido is installed but could not render (e.g. no browser available)
+        return None
+
+
+# Chart registry, in display order. "interactive" charts are always sent as
+# figures, the rest may be replaced by static images.
+CHARTS = [
+    dict(
+        key="age_histogram",
+        kind="histogram",
+        column="age",
+        title="Age Distribution",
+    ),
+    dict(
+        key="age_pie",
+        kind="pie",
+        column="age_group",
+        title="Age Distribution",
+    ),
+    dict(
+        key="nationality_bar",
+        kind="mbar",
+        column="citizenship",
+        title="Citizenship Distribution",
+    ),
+    dict(
+        key="ethnicity_pie",
+        kind="pie",
+        column="ethnicity",
+        title="Ethnicity Distribution",
+    ),
+    dict(
+        key="household_size_hist",
+        kind="histogram",
+        column="household_size",
+        title="Household Size Distribution",
+    ),
+    dict(
+        key="dif1_bar",
+        kind="bar",
+        column="dif_seeing",
+        title="Difficulty Seeing, Even When Wearing Glasses",
+    ),
+    dict(
+        key="dif2_bar",
+        kind="bar",
+        column="dif_hearing",
+        title="Difficulty Hearing, Even When Using a Hearing Aid",
+    ),
+    dict(
+        key="dif3_bar",
+        kind="bar",
+        column="dif_walking",
+        title="Difficulty Walking or Climbing Steps",
+    ),
+    dict(
+        key="dif4_bar",
+        kind="bar",
+        column="dif_remembering",
+        title="Difficulty Remembering or Concentrating",
+    ),
+    dict(
+        key="household_difficulty_pie",
+        kind="pie",
+        column="household_difficulty",
+        title="Household Difficulty",
+    ),
+    dict(
+        key="healthcare_need_pie",
+        kind="pie",
+        column="healthcare_need",
+        title=question_text("healthcare_need"),
+    ),
+    dict(
+        key="services_needed_bar",
+        kind="mbar",
+        column="services_needed",
+        title=question_text("services_needed"),
+    ),
+    dict(
+        key="able_to_access_healthservice_need_pie",
+        kind="pie",
+        column="healthcare_access",
+        title=question_text("healthcare_access"),
+    ),
+    dict(
+        key="coverage1_bar",
+        kind="mbar",
+        column="payment",
+        title=question_text("payment"),
+    ),
+    dict(
+        key="service_barriers1_bar",
+        kind="mbar",
+        column="service_barriers",
+        title=question_text("service_barriers"),
+    ),
+    dict(
+        key="access_preventive_bar",
+        kind="mbar",
+        column="access_preventive",
+        title="Difficulties in Accessing Preventive Health Services",
+    ),
+    dict(
+        key="access_reproductive_bar",
+        kind="mbar",
+        column="access_reproductive",
+        title="Difficulties in Accessing Reproductive Health Services",
+    ),
+    dict(
+        key="access_medicine_bar",
+        kind="mbar",
+        column="access_medicine",
+        title="Difficulties in Accessing Necessary Medications",
+    ),
+    dict(
+        key="procure_medicine_pie",
+        kind="pie",
+        column="procure_medicine",
+        title="How Medications are Procured",
+    ),
+    dict(
+        key="have_coverage_pie",
+        kind="pie",
+        column="has_insurance",
+        title="Health Insurance Coverage",
+    ),
+    dict(
+        key="not_coverage_pie",
+        kind="pie",
+        column="insurance_impact",
+        title="Impact of No Health Insurance on Access",
+    ),
+    dict(
+        key="info_sources_bar",
+        kind="mbar",
+        column="info_sources",
+        title="Sources of Health-Related Information",
+    ),
+    dict(
+        key="reliable_sources_pie",
+        kind="pie",
+        column="info_reliable",
+        title="Reliability of Health Information Sources",
+    ),
+    dict(
+        key="what_subjects_bar",
+        kind="mbar",
+        column="info_topics",
+        title="Desired Health Information Topics",
+    ),
+    dict(
+        key="healthcare_gaps_bar",
+        kind="mbar",
+        column="healthcare_gaps",
+        title="Biggest Gaps in Healthcare Services",
+    ),
+    dict(
+        key="grade_social_healthcare_pie",
+        kind="pie",
+        column="healthcare_satisfaction",
+        title="Satisfaction with Medical System",
+    ),
+    dict(
+        key="safety_concern_bar",
+        kind="mbar",
+        column="safety_concerns",
+        title="Safety and Security Concerns",
+    ),
+    dict(
+        key="safety_support_bar",
+        kind="mbar",
+        column="safety_support",
+        title="Support Systems for Safety Concerns",
+    ),
+    dict(
+        key="discrimination_pie",
+        kind="pie",
+        column="discrimination",
+        title="Experience of Discrimination",
+    ),
+    dict(
+        key="most_vulnerable_bar",
+        kind="mbar",
+        column="most_vulnerable",
+        title="Most Vulnerable Groups",
+    ),
+    dict(
+        key="women_challenge_bar",
+        kind="mbar",
+        column="women_risks",
+        title="Main Protection Risks for Women",
+    ),
+    dict(
+        key="men_challenge_bar",
+        kind="mbar",
+        column="men_risks",
+        title="Main Protection Risks for Men",
+    ),
+    dict(
+        key="children_challenge_bar",
+        kind="mbar",
+        column="children_challenges",
+        title="Main Challenges for Children",
+    ),
+    dict(
+        key="support_system_bar",
+        kind="mbar",
+        column="support_system",
+        title="Usual Support System",
+    ),
+    dict(
+        key="gbv_cases_pie",
+        kind="pie",
+        column="gbv_aware",
+        title="Awareness of Gender-Based Violence Cases",
+    ),
+    dict(
+        key="gbv_what_do_bar",
+        kind="mbar",
+        column="gbv_help",
+        title="Knowledge of Support for GBV",
+    ),
+    dict(
+        key="more_info_gbv_bar",
+        kind="mbar",
+        column="gbv_info",
+        title="Need More Information on GBV Services",
+    ),
+    dict(
+        key="child_info_bar",
+        kind="mbar",
+        column="child_protection_info",
+        title="Need More Information on Child Protection Services",
+    ),
+    dict(
+        key="mhpss_used_bar",
+        kind="mbar",
+        column="mhpss_used",
+        title="Accessed MHPSS Services",
+    ),
+    dict(
+        key="mhpss_provider_bar",
+        kind="mbar",
+        column="mhpss_provider",
+        title="MHPSS Providers",
+    ),
+    dict(
+        key="mhpss_quality_pie",
+        kind="pie",
+        column="mhpss_quality",
+        title="Satisfaction with MHPSS Services",
+    ),
+    dict(
+        key="mhpss_helpful_bar",
+        kind="mbar",
+        column="mhpss_helpful",
+        title="Helpful MHPSS Services",
+    ),
+    dict(
+        key="attend_school_pie",
+        kind="pie",
+        column="school_attendance",
+        title="Children Attending School",
+    ),
+    dict(
+        key="ed_support_bar",
+        kind="mbar",
+        column="school_support",
+        title="Educational Support Needed",
+    ),
+    dict(
+        key="ed_online_pie",
+        kind="pie",
+        column="online_schooling",
+        title="Impact of Online Schooling on Children",
+    ),
+    dict(
+        key="seek_employment_pie",
+        kind="pie",
+        column="job_seeking",
+        title="Attempted to Find Employment",
+    ),
+    dict(
+        key="secure_employment_pie",
+        kind="pie",
+        column="job_secured",
+        title="Secured Employment",
+    ),
+    dict(
+        key="job_challenge_bar",
+        kind="mbar",
+        column="job_challenges",
+        title="Job Challenges Faced",
+    ),
+    dict(
+        key="seek_employment_future_pie",
+        kind="pie",
+        column="job_seeking_future",
+        title="Planning to Seek Employment",
+    ),
+    dict(
+        key="job_support_bar",
+        kind="mbar",
+        column="job_support",
+        title="Support Needed for Employment",
+    ),
+    dict(
+        key="interaction_pie",
+        kind="pie",
+        column="community_interaction",
+        title="Level of Interaction with Local Community",
+    ),
+    dict(
+        key="future_concern_bar",
+        kind="mbar",
+        column="future_concerns",
+        title="Future Concerns",
+    ),
+    dict(
+        key="urgent_need_bar",
+        kind="mbar",
+        column="urgent_needs",
+        title="Urgent Needs",
+    ),
+    dict(
+        key="plans_bar",
+        kind="mbar",
+        column="future_plans",
+        title="Future Plans Regarding the War",
+    ),
+    dict(
+        key="access_heatmap",
+        kind="heatmap",
+        title="Heatmap: Correlation Between Age, Ethnicity, and Healthcare Access",
+        columns=[
+            "age_group",
+            "ethnicity",
+            "healthcare_access",
+        ],
+        interactive=True,
+    ),
+    dict(
+        key="access_facet",
+        kind="facet",
+        title="Healthcare Access by Ethnicity and Location",
+        columns=[
+            "ethnicity",
+            "settlement",
+            "healthcare_access",
+        ],
+        interactive=True,
+    ),
+    dict(
+        key="problems_treemap",
+        kind="treemap",
+        title="Distribution of Healthcare Problems by Ethnicity and Age Group",
+        columns=[
+            "ethnicity",
+            "age_group",
+            "service_barriers",
+        ],
+        interactive=True,
+    ),
+]
+
+# Multi-select option lists come from the schema
+for chart in CHARTS:
+    if chart["kind"] == "mbar":
+        chart["options"] = question_options(chart["column"])
+
+
+def aggregate_chart(df, chart):
+    # The data behind a chart: counts, bins or a cross-tab, or None when
+    # the sheet lacks the chart's columns
+    kind = chart["kind"]
+    if kind in ("pie", "bar"):
+        return value_counts(df, chart["column"])
+    if kind == "mbar":
+        return option_counts(df, chart["column"], chart["options"])
+    if kind == "histogram":
+        return histogram_bins(df, chart["column"])
+    if kind == "heatmap":
+        return access_table(df)
+    if kind == "facet":
+        return access_counts(df)
+    if kind == "treemap":
+        return problem_counts(df)
+    raise ValueError(f"Unknown chart kind: {kind}")
+
+
+def create_chart(chart, data):
+    if data is None:
+        return None
+    kind = chart["kind"]
+    if kind == "pie":
+        return create_sex_distribution_pie_chart(data, chart["title"])
+    if kind == "bar":
+        return create_bar_chart(data, chart["column"], chart["title"])
+    if kind == "mbar":
+        return create_mbar_chart(data, chart["title"])
+    if kind == "histogram":
+        return create_histogram(data, question_text(chart["column"]), chart["title"])
+    if kind == "heatmap":
+        return create_heatmap(data)
+    if kind == "facet":
+        return create_facet_chart(data)
+    if kind == "treemap":
+        return create_treemap(data)
+    raise ValueError(f"Unknown chart kind: {kind}")
+
+
+def build_chart(df, chart):
+    return create_chart(chart, aggregate_chart(df, chart))
+
+
+def build_figures(df):
+    # Figures for every chart in registry order; charts whose columns are
+    # missing from the sheet are skipped
+    figures = []
+    for chart in CHARTS:
+        fig = build_chart(df, chart)
+        if fig is not None:
+            figures.append((chart, fig))
+    return figures
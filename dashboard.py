@@ -0,0 +1,575 @@
+import time
+import zlib
+
+import streamlit as st
+
+from timings import STARTUP, timed
+
+# Imported once per server process, after app.py has put the page shell on
+# screen; the first run reports how long each group took
+with timed(STARTUP, "Import pandas and numpy"):
+    import pandas as pd
+
+with timed(STARTUP, "Import plotly"):
+    import plotly.io as pio
+    from charts import (
+        CHARTS,
+        PAYLOAD_BUDGET_BYTES,
+        compact_figure,
+        create_chart,
+        create_round_comparison,
+        create_trend_chart,
+        figure_to_image,
+    )
+
+with timed(STARTUP, "Import survey modules"):
+    from data_sources import source_from_config
+    from drilldown import DRILL_KINDS, PAGE_ROWS, RespondentIndex, page_rows
+    from estimates import chart_estimates, replicate_weights, respondent_weights, summary_estimates
+    from exports import FORMATS, available_formats, chart_table, export
+    from pipeline import make_executors
+    from schema import question_text
+    from significance import compare_groups
+    from survey import (
+        FILTERS,
+        canonical_selections,
+        cascade_counts,
+        filter_options,
+        params_values,
+        view_hash,
+        view_params,
+    )
+    from trends import BINS, TIMESTAMP_FORMAT, TREND_CHARTS, TrendStore
+    from validation import Validator
+    from writeins import WriteInClusters, write_in_counts
+
+# Row labels of the weighted averages table
+SUMMARY_LABELS = {
+    "average_household": "Avg household size",
+    "average_children": "Avg # of children in a household",
+    "average_elderly": "Avg # of elderly in a household",
+    "average_age": "Avg age",
+}
+
+
+@st.cache_resource
+def get_source():
+    # Configured with [data_source] in the secrets, the data_link sheet by default
+    return source_from_config(st.secrets)
+
+
+@st.cache_data
+def load_filter_index(round_id=None):
+    # Computed once per dataset version (and round); cleared by Data Refresh
+    return get_source().filter_index({"round": round_id} if round_id else {})
+
+
+@st.cache_data
+def load_view(view, _selections):
+    # Summary and chart counts of a view, cached under the view's hash so a
+    # shared link opens from the cache; cleared by Data Refresh
+    source = get_source()
+    thread_pool, process_pool = get_executors()
+    return source.summary_stats(_selections), source.aggregate(CHARTS, _selections, thread_pool, process_pool)
+
+
+def default_selections(source):
+    # Every filter value of the latest round
+    return {"round": source.round_ids()[-1]} if hasattr(source, "round_ids") else {}
+
+
+@st.cache_resource
+def get_executors():
+    # Shared by all sessions; set aggregation_processes in the secrets to move
+    # the multi-select tallies to worker processes
+    return make_executors(processes=int(st.secrets.get("aggregation_processes", 0)))
+
+
+@st.cache_resource
+def get_write_in_clusters(column):
+    # Kept across Data Refresh; only write-ins not seen before are clustered
+    return WriteInClusters()
+
+
+@st.cache_data
+def load_top_write_ins(column, options, selections):
+    # Per dataset version and filter selection; cleared by Data Refresh
+    responses = get_source().rows(selections, [column])[column]
+    return get_write_in_clusters(column).top(write_in_counts(responses, options))
+
+
+@st.cache_data
+def load_estimates(selections):
+    # Weighted estimates for every chart and the summary row, per dataset
+    # version and filter selection; cleared by Data Refresh. The [weights]
+    # table of the secrets sets the weights and interval = "linearized"
+    # replaces the bootstrap.
+    config = st.secrets.get("weights", {})
+    df = get_source().rows(selections)
+    weights = respondent_weights(df, config)
+    replicates = replicate_weights(weights) if config.get("interval", "bootstrap") == "bootstrap" else None
+    return chart_estimates(df, CHARTS, weights, replicates), summary_estimates(df, weights, replicates)
+
+
+@st.cache_data
+def load_group_comparison(group_key, method, selections):
+    # Per dataset version, grouping and filter selection; cleared by Data Refresh
+    column = next(column for key, _, column in FILTERS if key == group_key)
+    return compare_groups(get_source().rows(selections), CHARTS, column, method)
+
+
+@st.cache_resource
+def get_trend_store(round_id=None):
+    # Kept across Data Refresh; sync_trends() adds the new rows to it
+    return TrendStore(timestamp_format=st.secrets.get("timestamp_format", TIMESTAMP_FORMAT))
+
+
+@st.cache_data
+def sync_trends(round_id=None):
+    # Once per dataset version (and round); cleared by Data Refresh
+    store, source = get_trend_store(round_id), get_source()
+    columns = [column for column in store.columns() if column in source.columns()]
+    store.update(source.rows({"round": round_id} if round_id else {}, columns))
+    return store.rows
+
+
+@st.cache_resource
+def get_respondent_index(round_id=None):
+    # Kept across Data Refresh; sync_respondent_index() adds the new rows to it
+    return RespondentIndex()
+
+
+@st.cache_data
+def sync_respondent_index(round_id=None):
+    # Once per dataset version (and round); cleared by Data Refresh
+    index = get_respondent_index(round_id)
+    index.update(get_source().rows({"round": round_id} if round_id else {}))
+    return index.rows
+
+
+@st.cache_resource
+def get_validator(round_id=None):
+    # Kept across Data Refresh; only rows added since are validated
+    return Validator()
+
+
+@st.cache_data
+def load_data_quality(round_id=None):
+    # Diagnostics per dataset version (and round); cleared by Data Refresh.
+    # Databases return the report stored when the rows were ingested.
+    source = get_source()
+    if hasattr(source, "data_quality"):
+        return source.data_quality({"round": round_id} if round_id else {})
+    validator = get_validator(round_id)
+    validator.update(source.rows({"round": round_id} if round_id else {}))
+    return validator.report()
+
+
+def render_sidebar():
+    # The buttons show while the data loads
+    with st.sidebar:
+        st.header("Actions")
+        button_col1, button_col2 = st.columns(2)
+        with button_col1:
+            refresh_button = st.button('Data Refresh')
+        with button_col2:
+            reset_button = st.button('Reset Filters')
+
+        if refresh_button:
+            get_source().refresh()
+            load_view.clear()
+            load_filter_index.clear()
+            load_top_write_ins.clear()
+            load_estimates.clear()
+            load_group_comparison.clear()
+            sync_trends.clear()
+            sync_respondent_index.clear()
+            load_data_quality.clear()
+            # Precompute the default view that Reset Filters goes back to
+            default = default_selections(get_source())
+            load_view(view_hash(default), default)
+            st.rerun()
+
+        if reset_button:
+            # Back to the default view, and a URL without parameters
+            for key in ["round"] + [f"filter_{key}" for key, _, _ in FILTERS]:
+                if key in st.session_state:
+                    del st.session_state[key]
+            st.query_params.clear()
+
+        # A shared link: its filters are read when the session starts
+        url = {key: st.query_params.get_all(key) for key in st.query_params}
+        restore = "view_restored" not in st.session_state
+        st.session_state["view_restored"] = True
+
+        st.markdown("---")  # Optional: Add a horizontal line to separate buttons from filters
+
+        st.header("Filters")
+
+        with st.spinner("Loading survey data..."), timed(STARTUP, "Open data source"):
+            source = get_source()
+
+        selections = {}
+        round_id = None
+        if hasattr(source, "round_ids"):
+            rounds = source.rounds().set_index("round_id")["label"]
+            round_ids = list(rounds.index[::-1])
+            if restore and params_values(url, "round", round_ids):
+                st.session_state["round"] = params_values(url, "round", round_ids)[0]
+            round_id = st.selectbox(
+                "Please select Survey Round",
+                options=round_ids,
+                format_func=lambda value: rounds[value],
+                key="round",
+            )
+            selections["round"] = round_id
+
+        with st.spinner("Loading survey data..."), timed(STARTUP, "First data load"):
+            index = load_filter_index(round_id)
+        options = filter_options(index)
+
+        seeded = set()
+        if restore:
+            for key, _, _ in FILTERS:
+                values = params_values(url, key, options[key])
+                if values is not None:
+                    st.session_state[f"filter_{key}"] = values
+                    seeded.add(key)
+
+        cascading = st.toggle(
+            "Cascading filters",
+            help="Only offer values that match the other filters, with respondent counts.",
+        )
+        if cascading:
+            # The other filters' current values, from the previous run
+            current = {
+                key: st.session_state[f"filter_{key}"]
+                for key, _, _ in FILTERS
+                if f"filter_{key}" in st.session_state
+            }
+            counts = cascade_counts(index, current)
+
+        for key, label, column in FILTERS:
+            if cascading:
+                # Keep selected values on offer so narrowing never drops them
+                available = [
+                    value for value in options[key]
+                    if counts[key].get(value, 0) > 0 or value in current.get(key, [])
+                ]
+                selections[key] = st.multiselect(
+                    label,
+                    options=available,
+                    default=None if key in seeded else available,
+                    format_func=lambda value, key=key: f"{value} ({counts[key].get(value, 0)})",
+                    key=f"filter_{key}",
+                )
+            else:
+                selections[key] = st.multiselect(
+                    label,
+                    options=options[key],
+                    default=None if key in seeded else options[key],
+                    key=f"filter_{key}",
+                )
+
+        # Display total submissions after filters
+        st.markdown(f"**Total Submissions: {index['count'].sum()}**")
+
+        # The URL always shows the current view; the latest round is implied
+        selections = canonical_selections(selections, options)
+        shown = {key: values for key, values in selections.items() if key != "round" or values != round_ids[0]}
+        if view_params(shown) != url:
+            st.query_params.from_dict(view_params(shown))
+        st.caption(f"View {view_hash(selections)}: copy the page URL to share these filters.")
+
+        st.markdown("---")
+
+        st.header("Display")
+
+        display = dict(
+            static_charts=st.checkbox(
+                "Static images for simple charts",
+                help="Send simple charts as images instead of interactive figures (for slow connections).",
+            ),
+            write_ins=st.checkbox(
+                "Top write-in answers",
+                value=True,
+                help="List the most common free-text answers given under Other, grouped by similarity.",
+            ),
+            estimates=st.checkbox(
+                "Weighted estimates",
+                help="Weighted shares and means with 95% confidence intervals under each chart.",
+            ),
+            show_payload=st.checkbox("Show chart payload sizes"),
+            show_timings=st.checkbox(
+                "Show load timings",
+                help="Import and first-load times of the server, and how long each part of this page took.",
+            ),
+            payload_report=[],
+        )
+
+        render_export(source, selections)
+
+    return source, selections, display
+
+
+def render_export(source, selections):
+    st.markdown("---")
+
+    st.header("Export")
+
+    titles = {"rows": "Filtered responses"}
+    titles.update((chart["key"], f"Counts: {chart['title']}") for chart in CHARTS)
+    table = st.selectbox("Table", options=list(titles), format_func=titles.get)
+    format = st.selectbox("Format", options=available_formats())
+    extension, mime, _ = FORMATS[format]
+
+    # Generated only when the button is clicked, in chunks from the source
+    def build():
+        if table == "rows":
+            # Headers as the question text of the sheet
+            chunks = source.row_chunks(selections)
+            return export((chunk.rename(columns=question_text) for chunk in chunks), format)
+        chart = next(chart for chart in CHARTS if chart["key"] == table)
+        data = chart_table(chart, source.aggregate([chart], selections)[0])
+        return export([data if data is not None else pd.DataFrame()], format)
+
+    st.download_button("Download", data=build, file_name=f"msna_{table}.{extension}", mime=mime)
+
+
+def render_summary(stats):
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown(f"**Total Submissions:** {stats['total_submissions']}")
+    with col2:
+        st.markdown(f"**Avg household size:** {stats['average_household']}")
+    with col3:
+        st.markdown(f"**Max household size:** {stats['max_household']}")
+
+    col4, col5, col6 = st.columns(3)
+    with col4:
+        st.markdown(f"**Avg # of children in a household:** {stats['average_children']}")
+    with col5:
+        st.markdown(f"**Avg # of elderly in a household:** {stats['average_elderly']}")
+    with col6:
+        st.markdown(f"**Avg age:** {stats['average_age']}")
+
+
+def show_chart(fig, display, interactive=False, key=None):
+    # With a key, clicking a bar reruns the page; returns the
+    # selection event (None for static images)
+    fig = compact_figure(fig)
+    title = fig.layout.title.text or ""
+
+    if display["static_charts"] and not interactive:
+        image = figure_to_image(fig)
+        if image is not None:
+            st.image(image)
+            display["payload_report"].append((title, "image", len(image), len(image)))
+            return None
+
+    event = None
+    if key is None:
+        st.plotly_chart(fig)
+    else:
+        event = st.plotly_chart(fig, key=key, on_select="rerun", selection_mode="points")
+    if display["show_payload"]:
+        spec = pio.to_json(fig, validate=False).encode()
+        display["payload_report"].append((title, "figure", len(spec), len(zlib.compress(spec))))
+    return event
+
+
+def selected_answer(event):
+    # The answer of the clicked bar: its x value
+    points = event["selection"]["points"] if event else []
+    return points[0].get("x") if points else None
+
+
+def render_drilldown(chart, answer, selections):
+    round_id = selections.get("round")
+    sync_respondent_index(round_id)
+    index = get_respondent_index(round_id)
+    rows, positions = index.lookup(chart["key"], answer, selections)
+
+    with st.expander(f"Respondents who answered “{answer}” ({len(positions)})", expanded=True):
+        pages = max(1, -(-len(positions) // PAGE_ROWS))
+        page = 1
+        if pages > 1:
+            page = st.number_input("Page", min_value=1, max_value=pages, key=f"page_{chart['key']}")
+        st.caption(f"Page {page} of {pages}, {PAGE_ROWS} respondents per page. Click the bar again to close.")
+        st.dataframe(page_rows(rows, positions, page).rename(columns=question_text), hide_index=True)
+
+
+def render_write_ins(chart, selections):
+    with st.expander("Top write-in answers"):
+        top = load_top_write_ins(chart["column"], tuple(chart["options"]), selections)
+        st.dataframe(top, hide_index=True)
+
+
+def render_trends(selections):
+    round_id = selections.get("round")
+    sync_trends(round_id)
+    store = get_trend_store(round_id)
+
+    st.header("Trends")
+    titles = {chart["key"]: chart["title"] for chart in store.charts}
+    col1, col2 = st.columns(2)
+    with col1:
+        chart_key = st.selectbox("Question", options=TREND_CHARTS, format_func=titles.get, key="trend_question")
+    with col2:
+        bin = st.radio("Group submissions by", options=list(BINS), horizontal=True)
+
+    if store.undated:
+        st.warning(f"{store.undated} submissions have a timestamp that could not be read and are left out.")
+    trend = store.trend(chart_key, selections, bin)
+    if trend is None:
+        st.info("No dated submissions for the selected filters.")
+        return
+    st.plotly_chart(compact_figure(create_trend_chart(trend, titles[chart_key])))
+
+
+def render_group_comparison(selections):
+    st.header("Subgroup differences")
+    labels = {key: label.replace("Please select ", "") for key, label, _ in FILTERS}
+    col1, col2 = st.columns(2)
+    with col1:
+        group_key = st.selectbox(
+            "Compare groups by",
+            options=list(labels),
+            index=None,
+            format_func=labels.get,
+            placeholder="Choose a filter",
+        )
+    with col2:
+        method = st.selectbox(
+            "Multiple-comparison correction",
+            options=["fdr_bh", "holm"],
+            format_func={"fdr_bh": "Benjamini-Hochberg (FDR)", "holm": "Holm (family-wise)"}.get,
+        )
+    if group_key is None:
+        return
+
+    results = load_group_comparison(group_key, method, selections)
+    if results.empty:
+        st.info("No significant differences between the selected groups.")
+        return
+    st.markdown(f"**{len(results)} significant differences**, largest first (chi-square tests, 5% level after correction)")
+    st.dataframe(results, hide_index=True)
+
+
+def render_round_comparison(source, selections):
+    st.header("Round comparison")
+    rounds = source.rounds().set_index("round_id")["label"]
+    compared = st.multiselect(
+        "Rounds to compare",
+        options=list(rounds.index),
+        default=list(rounds.index),
+        format_func=lambda value: rounds[value],
+    )
+    comparable = [chart for chart in CHARTS if chart["kind"] in ("pie", "bar", "mbar")]
+    chart = st.selectbox(
+        "Question", options=comparable, format_func=lambda chart: chart["title"]
+    )
+    if not compared:
+        return
+
+    comparison = source.compare_rounds(chart, selections, compared)
+    if comparison.empty:
+        st.warning("No data available for the selected rounds.")
+        return
+    comparison["round"] = comparison["round_id"].map(rounds)
+    show_chart(
+        create_round_comparison(comparison, chart["title"]),
+        dict(static_charts=False, show_payload=False, payload_report=[]),
+        interactive=True,
+    )
+
+
+def render_payload_report(payload_report):
+    st.subheader("Chart payload sizes")
+    payload_df = pd.DataFrame(
+        payload_report, columns=["Chart", "Sent as", "Bytes", "Compressed bytes"]
+    )
+    payload_df["Over budget"] = payload_df["Bytes"] > PAYLOAD_BUDGET_BYTES
+    st.markdown(
+        f"**Total:** {payload_df['Bytes'].sum():,} bytes "
+        f"({payload_df['Compressed bytes'].sum():,} compressed), "
+        f"budget {PAYLOAD_BUDGET_BYTES:,} bytes per chart"
+    )
+    st.dataframe(payload_df.sort_values("Bytes", ascending=False), hide_index=True)
+
+
+def render_timings(timings):
+    st.subheader("Load timings")
+    st.caption("Server start: imports and the first data load, measured once per server process.")
+    st.dataframe(
+        pd.DataFrame(list(STARTUP.items()), columns=["Stage", "Seconds"]).round({"Seconds": 3}),
+        hide_index=True,
+    )
+    st.caption("This page: each part of the latest run, cached results included.")
+    st.dataframe(
+        pd.DataFrame(list(timings.items()), columns=["Stage", "Seconds"]).round({"Seconds": 3}),
+        hide_index=True,
+    )
+
+
+def main(started):
+    # Seconds per part of this run, from the start of app.py
+    timings = {"Page shell": time.perf_counter() - started}
+
+    with timed(timings, "Sidebar and filters"):
+        source, selections, display = render_sidebar()
+
+    # Filter query, and the chart counts of the same view
+    with timed(timings, "Summary and chart counts"):
+        stats, results = load_view(view_hash(selections), selections)
+        if stats["total_submissions"] == 0: # TO ADD MAIN!!!
+            st.warning("No data available for the selected filters.")
+            st.stop()
+
+        render_summary(stats)
+
+    with timed(timings, "Data quality"):
+        quality = load_data_quality(selections.get("round"))
+        if not quality.empty:
+            with st.expander(f"Data quality: {quality['Rows'].sum()} issues in the sheet"):
+                st.dataframe(quality, hide_index=True)
+
+    estimates = [None] * len(CHARTS)
+    if display["estimates"]:
+        with timed(timings, "Weighted estimates"):
+            estimates, summary = load_estimates(selections)
+            with st.expander("Weighted averages (95% CI)"):
+                st.dataframe(summary.rename(index=SUMMARY_LABELS))
+
+    with timed(timings, "Charts"):
+        for chart, data, estimate in zip(CHARTS, results, estimates):
+            fig = create_chart(chart, data)
+            if fig is not None:
+                # Bars of single and multi-select questions drill down to respondents
+                key = f"chart_{chart['key']}" if chart["kind"] in DRILL_KINDS else None
+                event = show_chart(fig, display, interactive=chart.get("interactive", False), key=key)
+                answer = selected_answer(event)
+                if answer is not None:
+                    render_drilldown(chart, answer, selections)
+            if estimate is not None:
+                with st.expander("Weighted estimates (95% CI)"):
+                    st.dataframe(estimate, hide_index=True)
+            if display["write_ins"] and chart["kind"] == "mbar" and data.attrs.get("write_ins"):
+                render_write_ins(chart, selections)
+
+    with timed(timings, "Trends"):
+        render_trends(selections)
+
+    with timed(timings, "Group comparison"):
+        render_group_comparison(selections)
+
+    if hasattr(source, "compare_rounds") and len(source.round_ids()) > 1:
+        with timed(timings, "Round comparison"):
+            render_round_comparison(source, selections)
+
+    if display["show_payload"] and display["payload_report"]:
+        render_payload_report(display["payload_report"])
+
+    timings["Total"] = time.perf_counter() - started
+    if display["show_timings"]:
+        render_timings(timings)
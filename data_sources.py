@@ -0,0 +1,396 @@
+"""Survey data backends.
+
+Every source offers the same methods: load(), filter_index(selections),
+rows(selections, columns), row_chunks(selections, columns),
+summary_stats(selections) and aggregate(charts, selections, thread_pool,
+process_pool); the SQL sources add data_quality(selections), the validation
+report stored at ingest. Google Sheet and
+file sources keep the whole sheet in a DataFrame; several sheets (e.g. one
+per region) are fetched concurrently and combined into one; the SQLite
+source answers the filters and count aggregations with indexed queries.
+
+Build a SQLite database from a sheet export:
+    python data_sources.py survey.csv survey.db
+"""
+import asyncio
+import hashlib
+import io
+import os
+import sqlite3
+import sys
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+import requests
+
+from charts import CHARTS, aggregate_chart, count_options, histogram_bins
+from pipeline import run_aggregations
+from schema import apply_schema, questions, schema_version
+from survey import (
+    FILTERS,
+    apply_filters,
+    categorize,
+    filter_index,
+    filter_mask,
+    load_sheet,
+    sheet_csv_url,
+    summary_stats,
+)
+from validation import validate
+
+SQLITE_TABLE = "responses"
+# Columns of the validation report that ingest stores next to the rows
+REPORT_COLUMNS = ["Check", "Column", "Rows", "Example rows"]
+# Rows per chunk when streaming rows out, e.g. for exports
+CHUNK_ROWS = 10_000
+# Pooled connections per host and seconds per request when fetching sheets
+SHEET_CONNECTIONS = 8
+SHEET_TIMEOUT = 60
+
+
+class FrameSource:
+    # Base for sources that are read into memory in one go
+    def __init__(self):
+        self._df = None
+
+    def read(self):
+        raise NotImplementedError
+
+    def load(self):
+        if self._df is None:
+            self._df = categorize(self.read())
+        return self._df
+
+    def refresh(self):
+        self._df = None
+
+    def filter_index(self, selections=None):
+        return filter_index(self.rows(selections or {}))
+
+    def columns(self):
+        return list(self.load().columns)
+
+    def rows(self, selections, columns=None):
+        df = apply_filters(self.load(), selections)
+        return df if columns is None else df[columns]
+
+    def row_chunks(self, selections, columns=None, chunk_rows=CHUNK_ROWS):
+        # The filtered rows a chunk at a time, so only one chunk is ever
+        # copied out of the loaded frame
+        df = self.load()
+        positions = np.flatnonzero(filter_mask(df, selections))
+        indexer = slice(None) if columns is None else df.columns.get_indexer(columns)
+        # An empty selection still yields one (empty) chunk with the columns
+        for start in range(0, max(len(positions), 1), chunk_rows):
+            yield df.iloc[positions[start:start + chunk_rows], indexer]
+
+    def summary_stats(self, selections):
+        return summary_stats(self.rows(selections))
+
+    def aggregate(self, charts, selections, thread_pool=None, process_pool=None):
+        return run_aggregations(self.rows(selections), charts, thread_pool, process_pool)
+
+
+class GoogleSheetSource(FrameSource):
+    def __init__(self, sheet_id):
+        super().__init__()
+        self.sheet_id = sheet_id
+
+    def read(self):
+        return load_sheet(self.sheet_id)
+
+
+class MultiSheetSource(FrameSource):
+    # Several sheets with the same questions, e.g. one per region, read as
+    # one dataset. The sheets are fetched concurrently over pooled
+    # connections. A refresh revalidates each sheet with its ETag or
+    # Last-Modified, so only sheets that changed are downloaded again, only
+    # those whose content changed are parsed again, and the combined frame is
+    # only rebuilt when one of them did.
+    def __init__(self, sheet_ids, connections=SHEET_CONNECTIONS):
+        super().__init__()
+        self.sheet_ids = list(sheet_ids)
+        self.sheets = {}
+        self.stale = False
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=connections, pool_maxsize=connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, sheet_id):
+        # (sheet, changed); a sheet is its validators, content hash and frame
+        cached = self.sheets.get(sheet_id)
+        headers = {}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["modified"]:
+            headers["If-Modified-Since"] = cached["modified"]
+        response = self.session.get(sheet_csv_url(sheet_id), headers=headers, timeout=SHEET_TIMEOUT)
+        if cached and response.status_code == 304:
+            return cached, False
+        response.raise_for_status()
+
+        sheet = {
+            "etag": response.headers.get("ETag"),
+            "modified": response.headers.get("Last-Modified"),
+            "hash": hashlib.sha256(response.content).hexdigest(),
+        }
+        # Servers without validators (the Google export) send the sheet every
+        # time; an unchanged sheet keeps its parsed frame
+        if cached and cached["hash"] == sheet["hash"]:
+            return dict(cached, **sheet), False
+        sheet["frame"] = apply_schema(pd.read_csv(io.BytesIO(response.content)))
+        return sheet, True
+
+    async def fetch_all(self):
+        return await asyncio.gather(*(asyncio.to_thread(self.fetch, sheet_id) for sheet_id in self.sheet_ids))
+
+    def update(self):
+        # Fetches every sheet; True when any of them changed
+        results = asyncio.run(self.fetch_all())
+        self.sheets = {sheet_id: sheet for sheet_id, (sheet, _) in zip(self.sheet_ids, results)}
+        return any(changed for _, changed in results)
+
+    def read(self):
+        self.update()
+        return concat_sheets([self.sheets[sheet_id]["frame"] for sheet_id in self.sheet_ids])
+
+    def load(self):
+        if self._df is None:
+            self._df = categorize(self.read())
+        elif self.stale and self.update():
+            self._df = categorize(concat_sheets([self.sheets[sheet_id]["frame"] for sheet_id in self.sheet_ids]))
+        self.stale = False
+        return self._df
+
+    def refresh(self):
+        # The next load() revalidates the sheets but keeps the combined frame
+        # unless one of them changed
+        self.stale = True
+
+
+def concat_sheets(frames):
+    # One frame with the columns in schema order, then any others; questions
+    # a sheet does not have are empty for its rows
+    present = {column: None for frame in frames for column in frame.columns}
+    columns = [column for column in questions() if column in present]
+    columns += [column for column in present if column not in columns]
+    return pd.concat([frame.reindex(columns=columns) for frame in frames], ignore_index=True)
+
+
+class FileSource(FrameSource):
+    # A local CSV or Parquet export of the sheet
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def read(self):
+        if self.path.endswith(".parquet"):
+            return apply_schema(pd.read_parquet(self.path))
+        return apply_schema(pd.read_csv(self.path))
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def store_version(path):
+    # Schema version a store was ingested with (SQLite's user_version); 0 for
+    # stores written before versions were recorded
+    with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def check_store_version(path, rebuild):
+    # Stored option codes and question ids only mean something under the
+    # schema they were ingested with
+    version = store_version(path)
+    if version != schema_version():
+        raise ValueError(
+            f"{path} was ingested with schema version {version}, but schema.json is version "
+            f"{schema_version()}. Rebuild it: {rebuild}"
+        )
+
+
+def report_table(table):
+    # Holds the validation report of a table's rows
+    return f"{table}_quality"
+
+
+class SQLiteSource:
+    def __init__(self, path, table=SQLITE_TABLE):
+        self.path = path
+        self.table = table
+        self._columns = None
+
+    def connect(self):
+        # One read-only connection per query so worker threads never share one
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def where(self, selections):
+        clauses, params = [], []
+        for key, _, column in FILTERS:
+            if key not in selections:
+                continue
+            values = [value for value in selections[key] if not pd.isna(value)]
+            terms = []
+            if values:
+                terms.append(f"{quote(column)} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            if len(values) < len(selections[key]):
+                # NaN was selected, which isin() matches against missing answers
+                terms.append(f"{quote(column)} IS NULL")
+            clauses.append(f"({' OR '.join(terms)})" if terms else "0")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, sql, params=()):
+        with closing(self.connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def load(self):
+        return self.query(f"SELECT * FROM {quote(self.table)}")
+
+    def refresh(self):
+        self._columns = None
+
+    def filter_index(self, selections=None):
+        where, params = self.where(selections or {})
+        columns = ", ".join(quote(column) for _, _, column in FILTERS)
+        # Order of first appearance, like survey.filter_index()
+        return self.query(
+            f"SELECT {columns}, COUNT(*) AS count FROM {quote(self.table)}{where} "
+            f"GROUP BY {columns} ORDER BY MIN(rowid)",
+            params,
+        )
+
+    def columns(self):
+        if self._columns is None:
+            self._columns = list(self.query(f"PRAGMA table_info({quote(self.table)})")["name"])
+        return self._columns
+
+    def data_quality(self, selections):
+        # The validation report written at ingest, so the diagnostics never
+        # read the rows back
+        columns = ", ".join(quote(column) for column in REPORT_COLUMNS)
+        return self.query(f"SELECT {columns} FROM {quote(report_table(self.table))} ORDER BY rowid")
+
+    def rows(self, selections, columns=None):
+        where, params = self.where(selections)
+        select = "*" if columns is None else ", ".join(quote(column) for column in columns)
+        return self.query(f"SELECT {select} FROM {quote(self.table)}{where}", params)
+
+    def row_chunks(self, selections, columns=None, chunk_rows=CHUNK_ROWS):
+        where, params = self.where(selections)
+        select = "*" if columns is None else ", ".join(quote(column) for column in columns)
+        with closing(self.connect()) as conn:
+            yield from pd.read_sql_query(
+                f"SELECT {select} FROM {quote(self.table)}{where}", conn, params=params, chunksize=chunk_rows
+            )
+
+    def summary_stats(self, selections):
+        where, params = self.where(selections)
+        stats = self.query(
+            "SELECT COUNT(*) AS total_submissions, "
+            "AVG(household_size) AS average_household, "
+            "MAX(household_size) AS max_household, "
+            "AVG(children) AS average_children, "
+            "AVG(elderly) AS average_elderly, "
+            "AVG(age) AS average_age "
+            f"FROM {quote(self.table)}{where}",
+            params,
+        ).to_dict("records")[0]
+        return {
+            key: (round(value, 1) if key.startswith("average") and value is not None else value)
+            for key, value in stats.items()
+        }
+
+    def value_counts(self, column, selections):
+        where, params = self.where(selections)
+        not_null = f"{quote(column)} IS NOT NULL"
+        where = f"{where} AND {not_null}" if where else f" WHERE {not_null}"
+        counts = self.query(
+            f"SELECT {quote(column)} AS value, COUNT(*) AS count FROM {quote(self.table)}{where} "
+            f"GROUP BY {quote(column)} ORDER BY count DESC",
+            params,
+        )
+        return pd.Series(counts["count"].values, index=pd.Index(counts["value"], name=column), name="count")
+
+    def aggregate_chart(self, chart, selections):
+        kind = chart["kind"]
+        if kind in ("pie", "bar"):
+            return self.value_counts(chart["column"], selections)
+        if kind == "mbar":
+            # Distinct responses are counted in SQL, options are matched in Python
+            counts = self.value_counts(chart["column"], selections)
+            return count_options(counts.index, counts.values, chart["options"])
+        if kind == "histogram":
+            return histogram_bins(self.rows(selections, [chart["column"]]), chart["column"])
+        # Cross-tab charts only need the handful of columns they use
+        columns = [column for column in chart["columns"] if column in self.columns()]
+        return aggregate_chart(self.rows(selections, columns), chart)
+
+    def aggregate(self, charts, selections, thread_pool=None, process_pool=None):
+        if thread_pool is None:
+            return [self.aggregate_chart(chart, selections) for chart in charts]
+        futures = [thread_pool.submit(self.aggregate_chart, chart, selections) for chart in charts]
+        return [future.result() for future in futures]
+
+
+def ingest_sqlite(df, path, table=SQLITE_TABLE):
+    # Write the sheet to SQLite with an index on every filter and chart column,
+    # and its validation report, which is returned
+    report = validate(df)
+    with closing(sqlite3.connect(path)) as conn:
+        df.to_sql(table, conn, if_exists="replace", index=False)
+        report.to_sql(report_table(table), conn, if_exists="replace", index=False)
+        conn.execute(f"PRAGMA user_version = {int(schema_version())}")
+        columns = {column for _, _, column in FILTERS}
+        for chart in CHARTS:
+            columns |= set(chart.get("columns", [chart.get("column")]))
+        for i, column in enumerate(sorted(columns & set(df.columns))):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {quote(f'{table}_{i}')} ON {quote(table)} ({quote(column)})")
+        # Composite index over the filter columns for the pushed-down WHERE clause
+        filter_columns = [column for _, _, column in FILTERS if column in df.columns]
+        if filter_columns:
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {quote(f'{table}_filters')} ON {quote(table)} "
+                f"({', '.join(quote(column) for column in filter_columns)})"
+            )
+        conn.commit()
+    return report
+
+
+def source_from_config(secrets):
+    # [data_source] in the secrets picks the backend; the Google Sheet from
+    # data_link is the default
+    config = secrets.get("data_source", {})
+    kind = config.get("type", "sheet")
+    if kind == "sheet":
+        # A list of sheets (sheet_ids, or data_link as a list) is combined
+        sheet_ids = config.get("sheet_ids", config.get("sheet_id", secrets.get("data_link")))
+        if isinstance(sheet_ids, (list, tuple)):
+            return MultiSheetSource(sheet_ids)
+        return GoogleSheetSource(sheet_ids)
+    if kind == "file":
+        return FileSource(config["path"])
+    if kind == "sqlite":
+        if not os.path.exists(config["path"]):
+            raise FileNotFoundError(config["path"])
+        check_store_version(config["path"], f"python data_sources.py <sheet export> {config['path']}")
+        return SQLiteSource(config["path"], config.get("table", SQLITE_TABLE))
+    if kind == "rounds":
+        from rounds import RoundStore
+
+        if not os.path.exists(config["path"]):
+            raise FileNotFoundError(config["path"])
+        check_store_version(config["path"], f"python rounds.py {config['path']} <round id> <sheet export>, per round")
+        return RoundStore(config["path"])
+    raise ValueError(f"Unknown data source type: {kind}")
+
+
+if __name__ == "__main__":
+    source, target = sys.argv[1:3]
+    report = ingest_sqlite(FileSource(source).read(), target)
+    if not report.empty:
+        print(report.to_string(index=False), file=sys.stderr)
@@ -0,0 +1,99 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from answers import parser_for
+from charts import CHARTS
+from survey import filter_mask
+from validation import edited, row_hashes
+
+# Charts whose bars are the answers to one question. Pies are left out:
+# plotly.js cannot select pie slices, so a click never reaches the app.
+DRILL_KINDS = ("bar", "mbar")
+
+# Respondents per drill-down page
+PAGE_ROWS = 50
+
+
+def answer_positions(responses, chart):
+    # Sorted positions of the respondents who gave each answer, keyed by the
+    # answer as text (the label of its bar)
+    codes, uniques = pd.factorize(responses)
+    # A stable sort keeps each answer's positions in order; missing answers
+    # (code -1) sort first and are skipped by the bounds
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    groups = [order[bounds[i]:bounds[i + 1]] for i in range(len(uniques))]
+    if chart["kind"] != "mbar":
+        return {str(answer): group for answer, group in zip(uniques, groups)}
+
+    # Each distinct response is parsed once; an option's respondents are
+    # those of every response that contains it
+    parser = parser_for(chart["options"])
+    parts = {}
+    for response, group in zip(uniques, groups):
+        for code in parser.codes_for(response):
+            parts.setdefault(code, []).append(group)
+    return {parser.options[code]: np.sort(np.concatenate(found)) for code, found in parts.items()}
+
+
+class RespondentIndex:
+    # Inverted index from every answer of the bar and multi-select questions
+    # to the sorted row positions of its respondents. Like
+    # validation.Validator, update() only indexes the rows added since the
+    # last call (their positions come after every indexed one, so appending
+    # keeps each list sorted) and starts over when a row seen before was
+    # deleted or edited. One index is shared by every session
+    # (st.cache_resource), so updates and lookups hold a lock.
+    def __init__(self, charts=CHARTS):
+        self.charts = [chart for chart in charts if chart["kind"] in DRILL_KINDS]
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.rows = 0
+        self.indexed = row_hashes(pd.DataFrame())
+        self.df = None
+        self.positions = {}
+
+    def update(self, df):
+        # Only edits to the indexed answers matter
+        hashes = row_hashes(df[[chart["column"] for chart in self.charts if chart["column"] in df.columns]])
+        with self.lock:
+            if edited(hashes, self.indexed):
+                self.reset()
+            self.df = df
+            new = df.iloc[self.rows:]
+            if new.empty:
+                return
+
+            for chart in self.charts:
+                if chart["column"] not in new.columns:
+                    continue
+                answers = self.positions.setdefault(chart["key"], {})
+                for answer, positions in answer_positions(new[chart["column"]], chart).items():
+                    positions = positions + self.rows
+                    if answer in answers:
+                        positions = np.concatenate([answers[answer], positions])
+                    answers[answer] = positions
+
+            self.rows = len(df)
+            self.indexed = hashes
+
+    def lookup(self, chart_key, answer, selections):
+        # (rows, positions): the indexed rows and the positions in them of the
+        # answer's respondents that match the filters. The filter mask is one
+        # vectorized pass over the categorical filter columns; copying the
+        # answer's rows out first would be slower.
+        with self.lock:
+            df = self.df
+            positions = self.positions.get(chart_key, {}).get(str(answer))
+        if positions is None:
+            return df, np.empty(0, dtype=np.intp)
+        return df, positions[filter_mask(df, selections).to_numpy()[positions]]
+
+
+def page_rows(df, positions, page, page_rows=PAGE_ROWS):
+    # The rows of one page (numbered from 1) of a lookup
+    return df.iloc[positions[(page - 1) * page_rows:page * page_rows]]
@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+
+from answers import parser_for
+from survey import FILTERS
+
+# Normal quantile of a two-sided 95% interval
+Z_95 = 1.959963984540054
+BOOTSTRAP_REPLICATES = 200
+# Answer columns whose replicate totals are computed in one matrix product
+BATCH_COLUMNS = 128
+
+# Weighted means shown next to the summary row, keyed like survey.summary_stats
+MEAN_COLUMNS = {
+    "average_household": "household_size",
+    "average_children": "children",
+    "average_elderly": "elderly",
+    "average_age": "age",
+}
+
+# Post-stratification cells: sex, age group and city/village
+STRATA = ["gender", "age", "accomodation"]
+
+
+def strata_columns(strata):
+    # Strata may be given as filter keys or as sheet columns
+    columns = {key: column for key, _, column in FILTERS}
+    return [columns.get(stratum, stratum) for stratum in strata]
+
+
+def respondent_weights(df, config):
+    # config is the [weights] table of the secrets:
+    #   column = "Weight"            per-respondent weights from the sheet
+    #   targets = "population.csv"   post-stratify to population counts per
+    #   strata = [...]               cell (strata columns plus "population")
+    # Without either every respondent weighs 1. Weights are scaled to a
+    # mean of 1; respondents in cells without a target get weight 0.
+    if "column" in config:
+        weights = pd.to_numeric(df[config["column"]], errors="coerce").fillna(0).to_numpy(float)
+    elif "targets" in config:
+        targets = config["targets"]
+        if isinstance(targets, str):
+            targets = pd.read_csv(targets)
+        columns = strata_columns(config.get("strata", STRATA))
+        targets = targets.rename(columns=dict(zip(config.get("strata", STRATA), columns)))
+        cells = pd.MultiIndex.from_frame(df[columns].astype(object))
+        population = pd.Series(
+            targets["population"].to_numpy(float),
+            index=pd.MultiIndex.from_frame(targets[columns].astype(object)),
+        )
+        respondents = cells.value_counts()
+        weights = (population.reindex(cells) / respondents.reindex(cells)).fillna(0).to_numpy()
+    else:
+        weights = np.ones(len(df))
+    total = weights.sum()
+    return weights * len(weights) / total if total > 0 else weights
+
+
+def answer_matrix(column, chart):
+    # 0/1 matrix of the answers each respondent gave and whether they
+    # answered; each distinct response is parsed once
+    codes, uniques = pd.factorize(column)
+    if chart["kind"] == "mbar":
+        answers = list(chart["options"])
+        parser = parser_for(answers)
+        pattern = np.zeros((len(uniques) + 1, len(answers)), dtype=np.float32)
+        for code, response in enumerate(uniques):
+            pattern[code, parser.codes_for(response)] = 1
+    else:
+        answers = list(uniques)
+        pattern = np.eye(len(uniques) + 1, len(uniques), dtype=np.float32)
+    # Code -1 (no answer) picks the all-zero last row
+    return answers, pattern[codes], codes >= 0
+
+
+def value_matrix(column):
+    # The same for a numeric question: one column holding the value
+    values = pd.to_numeric(column, errors="coerce").to_numpy(float)
+    answered = ~np.isnan(values)
+    return np.where(answered, values, 0).astype(np.float32)[:, None], answered
+
+
+def replicate_weights(weights, replicates=BOOTSTRAP_REPLICATES, seed=0):
+    # Poisson bootstrap: every replicate draws each respondent Poisson(1)
+    # times. Drawn once per selection and shared by all charts, so a chart
+    # costs one matrix product for all replicates.
+    rng = np.random.default_rng(seed)
+    return rng.poisson(1, size=(replicates, len(weights))).astype(np.float32) * weights.astype(np.float32)
+
+
+def ratio_estimates(questions, weights, replicates=None):
+    # Weighted ratio sum(w * x) / sum(w * answered) for every column of each
+    # question's (x, answered), with a 95% interval from the bootstrap
+    # replicates, or by Taylor linearization under with-replacement sampling
+    # when there are none
+    results = []
+    if replicates is None:
+        for x, answered in questions:
+            a = answered.astype(np.float32)
+            total = weights @ a
+            estimate = weights @ x / total
+            n = answered.sum()
+            z = weights[:, None] * (x - estimate * a[:, None]) / total
+            half = Z_95 * np.sqrt(n / max(n - 1, 1) * (z**2).sum(axis=0))
+            results.append((estimate, estimate - half, estimate + half))
+        return results
+
+    # Questions are placed side by side, each followed by its answered
+    # column, so one matrix product gives the replicate totals of a whole
+    # batch of questions
+    batch, width = [], 0
+    for i, (x, answered) in enumerate(questions):
+        batch.append((x, answered))
+        width += x.shape[1] + 1
+        if width >= BATCH_COLUMNS or i == len(questions) - 1:
+            stacked = np.hstack([np.hstack([x, answered[:, None]]) for x, answered in batch]).astype(np.float32)
+            totals = weights @ stacked
+            draws = replicates @ stacked
+            offset = 0
+            for x, _ in batch:
+                k = x.shape[1]
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    replicated = draws[:, offset:offset + k] / draws[:, offset + k:offset + k + 1]
+                lower, upper = np.nanpercentile(replicated, [2.5, 97.5], axis=0)
+                results.append((totals[offset:offset + k] / totals[offset + k], lower, upper))
+                offset += k + 1
+            batch, width = [], 0
+    return results
+
+
+def question_matrix(df, chart):
+    # (answers, x, answered, respondents, scale) behind a pie, bar,
+    # multi-select or histogram chart; None for other charts or when the
+    # sheet lacks the question
+    column = chart.get("column")
+    if chart["kind"] not in ("pie", "bar", "mbar", "histogram") or column not in df.columns:
+        return None
+    if chart["kind"] == "histogram":
+        x, answered = value_matrix(df[column])
+        return ["Mean"], x, answered, [answered.sum()], 1
+    answers, x, answered = answer_matrix(df[column], chart)
+    return answers, x, answered, x.sum(axis=0), 100
+
+
+def chart_estimates(df, charts, weights, replicates=None):
+    # Weighted share of respondents per answer (in %) for pie, bar and
+    # multi-select charts and the weighted mean for histograms, in registry
+    # order; None for charts without estimates
+    matrices = [question_matrix(df, chart) for chart in charts]
+    questions = [(matrix[1], matrix[2]) for matrix in matrices if matrix is not None]
+    results = iter(ratio_estimates(questions, weights, replicates))
+
+    tables = []
+    for matrix in matrices:
+        if matrix is None:
+            tables.append(None)
+            continue
+        answers, _, _, respondents, scale = matrix
+        estimate, lower, upper = next(results)
+        table = pd.DataFrame(
+            {
+                "Answer": answers,
+                "Estimate": estimate * scale,
+                "Lower": lower * scale,
+                "Upper": upper * scale,
+                "Respondents": np.asarray(respondents, dtype="int64"),
+            }
+        )
+        tables.append(table.sort_values("Estimate", ascending=False, kind="stable").round(1).reset_index(drop=True))
+    return tables
+
+
+def summary_estimates(df, weights, replicates=None):
+    # Weighted means of the summary row with 95% intervals
+    keys = [key for key, column in MEAN_COLUMNS.items() if column in df.columns]
+    questions = [value_matrix(df[MEAN_COLUMNS[key]]) for key in keys]
+    rows = {
+        key: (estimate[0], lower[0], upper[0])
+        for key, (estimate, lower, upper) in zip(keys, ratio_estimates(questions, weights, replicates))
+    }
+    return pd.DataFrame.from_dict(rows, orient="index", columns=["Estimate", "Lower", "Upper"]).round(1)
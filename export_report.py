@@ -0,0 +1,142 @@
+"""Render every chart for a list of filter presets into static reports.
+
+Presets are read from a JSON file mapping a preset name to filter selections
+keyed like survey.FILTERS, e.g.
+
+    {
+        "All respondents": {},
+        "Village, women": {"gender": ["Female"], "accomodation": ["Village"]}
+    }
+
+Usage:
+    python export_report.py presets.json --out reports
+    python export_report.py presets.json --csv survey.csv --format images
+"""
+import argparse
+import html
+import json
+import os
+import re
+import tomllib
+from concurrent.futures import ProcessPoolExecutor
+
+from charts import build_figures, figure_to_image
+from data_sources import FileSource, MultiSheetSource
+from survey import apply_filters, load_sheet, summary_stats
+
+STAT_LABELS = {
+    "total_submissions": "Total Submissions",
+    "average_household": "Avg household size",
+    "max_household": "Max household size",
+    "average_children": "Avg # of children in a household",
+    "average_elderly": "Avg # of elderly in a household",
+    "average_age": "Avg age",
+}
+
+# Survey data shared by every preset rendered in a worker process
+_worker_df = None
+
+
+def _init_worker(df):
+    global _worker_df
+    _worker_df = df
+
+
+def slugify(name):
+    return re.sub(r"[^A-Za-z0-9]+", "-", name).strip("-").lower() or "preset"
+
+
+def render_html(name, selections, df):
+    parts = [
+        "<!DOCTYPE html>",
+        "<html><head><meta charset='utf-8'>",
+        f"<title>MSNA Survey: {html.escape(name)}</title></head><body>",
+        f"<h1>MSNA Survey: {html.escape(name)}</h1>",
+    ]
+    for key, values in selections.items():
+        parts.append(f"<p><b>{html.escape(key)}:</b> {html.escape(', '.join(map(str, values)))}</p>")
+
+    if df.empty:
+        parts.append("<p>No data available for the selected filters.</p>")
+    else:
+        parts.append("<ul>")
+        for key, value in summary_stats(df).items():
+            parts.append(f"<li><b>{STAT_LABELS[key]}:</b> {value}</li>")
+        parts.append("</ul>")
+
+        # plotly.js is inlined once so the file opens without network access
+        include_js = True
+        for _, fig in build_figures(df):
+            parts.append(fig.to_html(full_html=False, include_plotlyjs=include_js))
+            include_js = False
+
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def export_preset(name, selections, out_dir, format="html"):
+    df = apply_filters(_worker_df, selections)
+    slug = slugify(name)
+
+    if format == "html":
+        path = os.path.join(out_dir, f"{slug}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(render_html(name, selections, df))
+        return path
+
+    path = os.path.join(out_dir, slug)
+    os.makedirs(path, exist_ok=True)
+    if df.empty:
+        return path
+    for i, (chart, fig) in enumerate(build_figures(df)):
+        image = figure_to_image(fig, format="png")
+        if image is None:
+            raise RuntimeError("Image export requires the kaleido package")
+        with open(os.path.join(path, f"{i:02d}_{chart['key']}.png"), "wb") as f:
+            f.write(image)
+    return path
+
+
+def read_sheet_id(secrets_path=".streamlit/secrets.toml"):
+    with open(secrets_path, "rb") as f:
+        return tomllib.load(f)["data_link"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export static MSNA reports for filter presets.")
+    parser.add_argument("presets", help="JSON file mapping preset names to filter selections")
+    parser.add_argument("--out", default="reports", help="Output directory")
+    parser.add_argument("--csv", help="Read survey data from a local CSV/Parquet file instead of the sheet")
+    parser.add_argument(
+        "--sheet-id", nargs="+", help="Google Sheet id(s), combined if several (defaults to data_link in secrets.toml)"
+    )
+    parser.add_argument("--format", choices=["html", "images"], default="html")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    with open(args.presets, encoding="utf-8") as f:
+        presets = json.load(f)
+
+    # Load once; each worker receives the frame a single time at startup
+    if args.csv:
+        df = FileSource(args.csv).read()
+    else:
+        sheet_ids = args.sheet_id or read_sheet_id()
+        if isinstance(sheet_ids, str):
+            sheet_ids = [sheet_ids]
+        df = load_sheet(sheet_ids[0]) if len(sheet_ids) == 1 else MultiSheetSource(sheet_ids).read()
+
+    os.makedirs(args.out, exist_ok=True)
+    with ProcessPoolExecutor(
+        max_workers=min(args.workers, len(presets)) or 1, initializer=_init_worker, initargs=(df,)
+    ) as pool:
+        futures = [
+            pool.submit(export_preset, name, selections, args.out, args.format)
+            for name, selections in presets.items()
+        ]
+        for future in futures:
+            print(future.result())
+
+
+if __name__ == "__main__":
+    main()
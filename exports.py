@@ -0,0 +1,88 @@
+import importlib.util
+import io
+
+import pandas as pd
+
+# Download formats: file extension, MIME type and the optional package
+# that writes them
+FORMATS = {
+    "CSV": ("csv", "text/csv", None),
+    "Parquet": ("parquet", "application/vnd.apache.parquet", "pyarrow"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsxwriter"),
+}
+
+
+def available_formats():
+    formats = []
+    for name, (_, _, module) in FORMATS.items():
+        # Looked up without importing the package
+        if module is None or importlib.util.find_spec(module) is not None:
+            formats.append(name)
+    return formats
+
+
+def write_csv(chunks, out):
+    for i, chunk in enumerate(chunks):
+        out.write(chunk.to_csv(index=False, header=i == 0).encode())
+
+
+def write_parquet(chunks, out):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer, schema = None, None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            # Columns that are empty in the first chunk are stored as text
+            schema = pa.schema(
+                [field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema]
+            ).remove_metadata()
+            writer = pq.ParquetWriter(out, schema)
+        writer.write_table(table.cast(schema))
+    if writer is not None:
+        writer.close()
+
+
+def write_xlsx(chunks, out):
+    import xlsxwriter
+
+    # constant_memory writes each row out as soon as the next one starts
+    workbook = xlsxwriter.Workbook(out, {"constant_memory": True})
+    sheet = workbook.add_worksheet()
+    row = 0
+    for chunk in chunks:
+        if row == 0:
+            sheet.write_row(0, 0, [str(column) for column in chunk.columns])
+            row = 1
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for record in values.itertuples(index=False):
+            sheet.write_row(row, 0, record)
+            row += 1
+    workbook.close()
+
+
+WRITERS = {"CSV": write_csv, "Parquet": write_parquet, "Excel": write_xlsx}
+
+
+def export(chunks, format="CSV"):
+    # Writes the chunks one after the other; only the output file and one
+    # chunk are in memory at a time
+    out = io.BytesIO()
+    WRITERS[format](chunks, out)
+    return out.getvalue()
+
+
+def chart_table(chart, data):
+    # The count table behind a chart, as a flat table
+    kind = chart["kind"]
+    if data is None:
+        return None
+    if kind in ("pie", "bar", "mbar"):
+        return data.rename_axis("Answer").reset_index(name="Count")
+    if kind == "histogram":
+        counts, edges = data
+        return pd.DataFrame({"From": edges[:-1], "To": edges[1:], "Count": counts})
+    if kind == "heatmap":
+        return data.reset_index()
+    return data
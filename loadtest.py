@@ -0,0 +1,202 @@
+"""Load-test the dashboard with many concurrent simulated sessions.
+
+A local HTTP server stands in for the sheet export: it serves a CSV the way
+the dashboard reads the Google Sheet (pd.read_csv of a URL). Each session is
+a Streamlit AppTest running app.py in its own thread of this process, so the
+sessions share st.cache_data and st.cache_resource like sessions of one
+server do. After the first page load a session changes random filters (and
+now and then presses Reset Filters) for a number of reruns.
+
+Reported: rerun latency percentiles (first loads separately), the process's
+memory growth per session, how often the stand-in was fetched and CPU time
+in three parts:
+- per session, the thread time of its script runs;
+- the shared aggregation thread pool, which runs the chart counts of every
+  session and so cannot be split between them;
+- the whole process, which adds AppTest and the HTTP stand-in.
+Worker processes (aggregation_processes in the secrets) are not counted.
+
+Usage:
+    python loadtest.py survey.csv --sessions 8 --reruns 10
+    python loadtest.py survey.csv --sessions 4 --json loadtest.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.util import patch_config_options
+
+from pipeline import THREAD_NAME_PREFIX
+from survey import FILTERS
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Runs app.py as Streamlit would and records the script thread's CPU time,
+# which leaves out the chart counts handed to the aggregation pool
+SESSION_SCRIPT = """
+import runpy
+import time
+
+import streamlit as st
+
+cpu = time.thread_time()
+try:
+    runpy.run_path({app_path!r}, run_name="__main__")
+finally:
+    st.session_state["loadtest_cpu"] = time.thread_time() - cpu
+"""
+
+PERCENTILES = [50, 90, 95, 99]
+
+# Share of the steps that press Reset Filters instead of changing a filter
+RESET_SHARE = 0.1
+
+
+def serve_csv(path):
+    # The sheet export stand-in on a free local port; counts the requests
+    with open(path, "rb") as f:
+        body = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            server.requests += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/export?format=csv"
+
+
+def rss_bytes():
+    # Current resident memory of this process
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def pool_cpu():
+    # CPU time of the aggregation threads alive in this process
+    return sum(
+        time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+        for thread in threading.enumerate()
+        if thread.name.startswith(THREAD_NAME_PREFIX)
+    )
+
+
+def run_session(number, url, reruns, timeout, seed):
+    # One analyst: the first page load, then filter changes
+    rng = random.Random(seed + number)
+    at = AppTest.from_string(SESSION_SCRIPT.format(app_path=APP_PATH), default_timeout=timeout)
+    at.secrets["data_source"] = {"type": "file", "path": url}
+    latencies, cpu, errors = [], 0.0, 0
+
+    for step in range(reruns + 1):
+        if step and rng.random() < RESET_SHARE:
+            action = next(button for button in at.sidebar.button if button.label == "Reset Filters").click()
+        elif step:
+            key = rng.choice([key for key, _, _ in FILTERS])
+            widget = at.multiselect(key=f"filter_{key}")
+            values = rng.sample(widget.options, rng.randint(1, len(widget.options))) if widget.options else []
+            action = widget.set_value(values)
+        else:
+            action = at
+        start = time.perf_counter()
+        action.run()
+        latencies.append(time.perf_counter() - start)
+        cpu += at.session_state["loadtest_cpu"] if "loadtest_cpu" in at.session_state else 0.0
+        errors += len(at.exception)
+
+    return {"session": number, "first": latencies[0], "reruns": latencies[1:], "cpu": cpu, "errors": errors}
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    return {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES} | {"max": float(max(values))}
+
+
+def load_test(csv_path, sessions=4, reruns=10, timeout=300, seed=0):
+    server, url = serve_csv(csv_path)
+    rss = rss_bytes()
+    cpu, aggregation = time.process_time(), pool_cpu()
+    start = time.perf_counter()
+    # AppTest turns its test mode on and off around every run, for the whole
+    # process; held on here so one session finishing never turns it off
+    # under another that is still running
+    try:
+        with patch_config_options({"global.appTest": True}), ThreadPoolExecutor(max_workers=sessions) as pool:
+            results = list(pool.map(lambda number: run_session(number, url, reruns, timeout, seed), range(sessions)))
+    finally:
+        server.shutdown()
+    elapsed = time.perf_counter() - start
+
+    reruns_done = [latency for result in results for latency in result["reruns"]]
+    return {
+        "sessions": sessions,
+        "reruns_per_session": reruns,
+        "seconds": elapsed,
+        "reruns_per_second": (len(reruns_done) + sessions) / elapsed,
+        "first_load": percentiles([result["first"] for result in results]),
+        "rerun": percentiles(reruns_done),
+        "cpu_per_session": percentiles([result["cpu"] for result in results]),
+        "pool_cpu_seconds": pool_cpu() - aggregation,
+        "process_cpu_seconds": time.process_time() - cpu,
+        "memory_per_session_mb": (rss_bytes() - rss) / sessions / 2**20,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_memory_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10,
+        "sheet_requests": server.requests,
+        "errors": sum(result["errors"] for result in results),
+    }
+
+
+def print_report(report):
+    print(
+        f"{report['sessions']} sessions x {report['reruns_per_session']} reruns in {report['seconds']:.1f}s "
+        f"({report['reruns_per_second']:.2f} runs/s), {report['errors']} errors"
+    )
+    for name, label in [("first_load", "First load (s)"), ("rerun", "Rerun (s)"), ("cpu_per_session", "CPU per session (s)")]:
+        print(f"{label:<22}" + "  ".join(f"{key} {value:.3f}" for key, value in report[name].items()))
+    print(
+        f"CPU: {report['pool_cpu_seconds']:.1f}s in the shared aggregation pool, "
+        f"{report['process_cpu_seconds']:.1f}s in the whole process"
+    )
+    print(
+        f"Memory: {report['memory_per_session_mb']:.1f} MB per session, peak {report['peak_memory_mb']:.0f} MB; "
+        f"sheet fetched {report['sheet_requests']} times"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the MSNA dashboard with simulated sessions.")
+    parser.add_argument("csv", help="CSV export of the sheet, served over local HTTP as the data source")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent sessions")
+    parser.add_argument("--reruns", type=int, default=10, help="Filter changes per session after the first load")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds a single rerun may take")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = load_test(args.csv, args.sessions, args.reruns, args.timeout, args.seed)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
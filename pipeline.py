@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from charts import CHARTS, aggregate_chart, count_options
+
+# Chart kinds whose aggregation is pure-Python string matching. They go to
+# the process pool when there is one; pandas/NumPy work runs in threads.
+PROCESS_KINDS = {"mbar"}
+
+# Names of the aggregation threads, e.g. for loadtest.py's CPU accounting
+THREAD_NAME_PREFIX = "aggregation"
+
+
+def make_executors(threads=None, processes=0):
+    thread_pool = ThreadPoolExecutor(max_workers=threads or os.cpu_count(), thread_name_prefix=THREAD_NAME_PREFIX)
+    process_pool = None
+    if processes:
+        # spawn, not fork: the parent is a multi-threaded Streamlit server
+        process_pool = ProcessPoolExecutor(max_workers=processes, mp_context=get_context("spawn"))
+    return thread_pool, process_pool
+
+
+def share_codes(series):
+    # Factorize a column and copy the integer codes into shared memory so
+    # worker processes read them directly instead of unpickling every row
+    codes, uniques = pd.factorize(series)
+    shm = shared_memory.SharedMemory(create=True, size=max(codes.nbytes, 1))
+    np.ndarray(codes.shape, dtype=codes.dtype, buffer=shm.buf)[:] = codes
+    return shm, codes.shape, codes.dtype.str, list(uniques)
+
+
+def _count_shared_options(shm_name, shape, dtype, uniques, option_list):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        codes = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        # Missing answers are coded -1
+        weights = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    finally:
+        shm.close()
+    return count_options(uniques, weights, option_list)
+
+
+def run_aggregations(df, charts=CHARTS, thread_pool=None, process_pool=None):
+    # Aggregate every chart, returning the results in registry order.
+    # Without a thread pool everything runs serially in the calling thread.
+    if thread_pool is None:
+        return [aggregate_chart(df, chart) for chart in charts]
+
+    shared = []
+    futures = []
+    try:
+        for chart in charts:
+            if process_pool is not None and chart["kind"] in PROCESS_KINDS:
+                shm, shape, dtype, uniques = share_codes(df[chart["column"]])
+                shared.append(shm)
+                futures.append(
+                    process_pool.submit(
+                        _count_shared_options, shm.name, shape, dtype, uniques, chart["options"]
+                    )
+                )
+            else:
+                futures.append(thread_pool.submit(aggregate_chart, df, chart))
+        return [future.result() for future in futures]
+    finally:
+        for shm in shared:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,240 @@
+"""Embedded store for several MSNA survey rounds.
+
+Each round is ingested once into a SQLite file: the sheet rows go to the
+responses table tagged with a round_id, and multi-select answers are exploded
+into answer_options (one row per respondent and chosen option). RoundStore
+serves the dashboard's aggregates for one round and compares rounds with a
+single GROUP BY query.
+
+    python rounds.py store.db 2024-05 round1.csv --label "Round 1 (May 2024)"
+"""
+import argparse
+import hashlib
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from answers import parser_for
+from charts import CHARTS
+from data_sources import REPORT_COLUMNS, FileSource, SQLiteSource, quote, report_table
+from schema import schema_version
+from survey import FILTERS
+from validation import validate
+
+RESPONSES_TABLE = "responses"
+OPTIONS_TABLE = "answer_options"
+ROUNDS_TABLE = "rounds"
+
+
+def index_name(*columns):
+    digest = hashlib.md5("\0".join(columns).encode()).hexdigest()[:12]
+    return quote(f"idx_{digest}")
+
+
+def exploded_options(df, round_id):
+    # One (round_id, row_id, question id, option code) row per chosen option
+    frames = []
+    for chart in CHARTS:
+        if chart["kind"] != "mbar" or chart["column"] not in df.columns:
+            continue
+        responses = df[chart["column"]].dropna()
+        # Parse each distinct response once
+        parser = parser_for(chart["options"])
+        matches = {response: parser.codes_for(response) for response in responses.unique()}
+        exploded = responses.map(matches).explode().dropna()
+        frames.append(
+            pd.DataFrame(
+                {
+                    "round_id": round_id,
+                    "row_id": exploded.index,
+                    "question": chart["column"],
+                    "option": exploded.values.astype("int64"),
+                }
+            )
+        )
+    if not frames:
+        return pd.DataFrame(columns=["round_id", "row_id", "question", "option"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def create_indexes(conn, columns):
+    conn.execute(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name('round_id', 'row_id')} "
+        f"ON {RESPONSES_TABLE} (round_id, row_id)"
+    )
+    indexed = {column for _, _, column in FILTERS}
+    indexed |= {chart["column"] for chart in CHARTS if chart["kind"] in ("pie", "bar", "histogram")}
+    for column in sorted(indexed & set(columns)):
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {index_name('round_id', column)} "
+            f"ON {RESPONSES_TABLE} (round_id, {quote(column)})"
+        )
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {index_name('question', 'round_id', 'option')} "
+        f"ON {OPTIONS_TABLE} (question, round_id, option)"
+    )
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {index_name('round_id', 'row_id', 'question')} "
+        f"ON {OPTIONS_TABLE} (round_id, row_id, question)"
+    )
+
+
+def ingest_round(path, round_id, df, label=None):
+    # Add (or replace) one survey round in the store, with its validation
+    # report, which is returned
+    round_id = str(round_id)
+    df = df.reset_index(drop=True)
+    rows = df.assign(round_id=round_id, row_id=df.index)
+    report = validate(df)
+
+    with closing(sqlite3.connect(path)) as conn:
+        # Rounds ingested under another schema version have other option
+        # codes; the store is rebuilt rather than mixed
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        stored = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (ROUNDS_TABLE,)).fetchone()
+        if stored and version != schema_version():
+            raise ValueError(
+                f"{path} holds rounds ingested with schema version {version}, but schema.json is version "
+                f"{schema_version()}. Ingest every round into a new store."
+            )
+        conn.execute(f"PRAGMA user_version = {int(schema_version())}")
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {ROUNDS_TABLE} "
+            "(round_id TEXT PRIMARY KEY, label TEXT, ingested_at TEXT, rows INTEGER)"
+        )
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {OPTIONS_TABLE} "
+            "(round_id TEXT, row_id INTEGER, question TEXT, option INTEGER)"
+        )
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {quote(report_table(RESPONSES_TABLE))} "
+            f"(round_id TEXT, {', '.join(quote(column) for column in REPORT_COLUMNS)})"
+        )
+
+        # Rounds may add questions; the responses table is the union of all
+        # sheet headers, with NULL where a round did not ask a question
+        existing = [row[1] for row in conn.execute(f"PRAGMA table_info({RESPONSES_TABLE})")]
+        if existing:
+            for column in rows.columns:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {RESPONSES_TABLE} ADD COLUMN {quote(column)}")
+            conn.execute(f"DELETE FROM {RESPONSES_TABLE} WHERE round_id = ?", (round_id,))
+        conn.execute(f"DELETE FROM {OPTIONS_TABLE} WHERE round_id = ?", (round_id,))
+        conn.execute(f"DELETE FROM {quote(report_table(RESPONSES_TABLE))} WHERE round_id = ?", (round_id,))
+
+        rows.to_sql(RESPONSES_TABLE, conn, if_exists="append", index=False)
+        exploded_options(df, round_id).to_sql(OPTIONS_TABLE, conn, if_exists="append", index=False)
+        report.assign(round_id=round_id).to_sql(report_table(RESPONSES_TABLE), conn, if_exists="append", index=False)
+        conn.execute(
+            f"INSERT OR REPLACE INTO {ROUNDS_TABLE} VALUES (?, ?, ?, ?)",
+            (round_id, label or round_id, datetime.now(timezone.utc).isoformat(), len(df)),
+        )
+        create_indexes(conn, set(existing) | set(rows.columns))
+        conn.commit()
+    return report
+
+
+class RoundStore(SQLiteSource):
+    # Serves one round at a time; selections["round"] picks it and the most
+    # recently ingested round is the default
+    def __init__(self, path):
+        super().__init__(path, RESPONSES_TABLE)
+        self._rounds = None
+
+    def rounds(self):
+        if self._rounds is None:
+            self._rounds = self.query(
+                f"SELECT round_id, label, ingested_at, rows FROM {ROUNDS_TABLE} ORDER BY ingested_at"
+            )
+        return self._rounds
+
+    def round_ids(self):
+        return list(self.rounds()["round_id"])
+
+    def refresh(self):
+        super().refresh()
+        self._rounds = None
+
+    def where(self, selections):
+        where, params = super().where(selections)
+        round_id = selections.get("round") or self.round_ids()[-1]
+        where = f"{where} AND round_id = ?" if where else " WHERE round_id = ?"
+        return where, params + [round_id]
+
+    def data_quality(self, selections):
+        round_id = selections.get("round") or self.round_ids()[-1]
+        columns = ", ".join(quote(column) for column in REPORT_COLUMNS)
+        return self.query(
+            f"SELECT {columns} FROM {quote(report_table(RESPONSES_TABLE))} WHERE round_id = ? ORDER BY rowid",
+            [round_id],
+        )
+
+    def option_counts(self, column, option_list, selections):
+        where, params = self.where(selections)
+        counts = self.query(
+            f"SELECT option, COUNT(*) AS count FROM {OPTIONS_TABLE} "
+            f"WHERE question = ? AND (round_id, row_id) IN "
+            f"(SELECT round_id, row_id FROM {RESPONSES_TABLE}{where}) GROUP BY option",
+            [column] + params,
+        )
+        counts = pd.Series(counts["count"].values, index=counts["option"])
+        # Option codes back to the option text
+        counts = counts.reindex(range(len(option_list)), fill_value=0).astype("int64")
+        return counts.set_axis(option_list)
+
+    def aggregate_chart(self, chart, selections):
+        if chart["kind"] == "mbar":
+            return self.option_counts(chart["column"], chart["options"], selections)
+        return super().aggregate_chart(chart, selections)
+
+    def compare_rounds(self, chart, selections, round_ids):
+        # Answer counts and shares per round for one pie/bar/multi-select chart
+        where, params = SQLiteSource.where(self, selections)
+        rounds_clause = f"round_id IN ({', '.join('?' * len(round_ids))})"
+        where = f"{where} AND {rounds_clause}" if where else f" WHERE {rounds_clause}"
+        params = params + list(round_ids)
+        column = quote(chart["column"])
+
+        if chart["kind"] == "mbar":
+            counts = self.query(
+                f"SELECT round_id, option AS answer, COUNT(*) AS count FROM {OPTIONS_TABLE} "
+                f"WHERE question = ? AND (round_id, row_id) IN "
+                f"(SELECT round_id, row_id FROM {RESPONSES_TABLE}{where}) "
+                "GROUP BY round_id, option",
+                [chart["column"]] + params,
+            )
+            counts["answer"] = counts["answer"].map(dict(enumerate(chart["options"])))
+        else:
+            counts = self.query(
+                f"SELECT round_id, {column} AS answer, COUNT(*) AS count FROM {RESPONSES_TABLE}"
+                f"{where} AND {column} IS NOT NULL GROUP BY round_id, {column}",
+                params,
+            )
+        # Share of the round's (filtered) respondents who answered the question
+        respondents = self.query(
+            f"SELECT round_id, COUNT(*) AS respondents FROM {RESPONSES_TABLE}"
+            f"{where} AND {column} IS NOT NULL GROUP BY round_id",
+            params,
+        )
+        comparison = counts.merge(respondents, on="round_id")
+        comparison["share"] = comparison["count"] / comparison["respondents"] * 100
+        return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest a survey round into the round store.")
+    parser.add_argument("store", help="SQLite file holding all rounds")
+    parser.add_argument("round_id")
+    parser.add_argument("data", help="CSV/Parquet export of the round's sheet")
+    parser.add_argument("--label", help="Display name of the round")
+    args = parser.parse_args(argv)
+    report = ingest_round(args.store, args.round_id, FileSource(args.data).read(), args.label)
+    if not report.empty:
+        print(report.to_string(index=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import difflib
+import json
+import os
+import re
+from functools import lru_cache
+
+# Questions of the sheet: a short id, the question text as it appears in the
+# sheet header, the type (single, multi, numeric or timestamp) and, for
+# multi-select questions, the option list. An option's position in the list
+# is its integer code. Bump the version when ids or options change: SQLite
+# stores record it at ingest and must be rebuilt under a new version.
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.json")
+
+# Minimum similarity of an edited header to the schema's question text
+HEADER_CUTOFF = 0.85
+
+
+@lru_cache(maxsize=None)
+def load_schema(path=SCHEMA_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def schema_version():
+    return load_schema()["version"]
+
+
+@lru_cache(maxsize=None)
+def questions():
+    return {question["id"]: question for question in load_schema()["questions"]}
+
+
+def question_text(question_id):
+    question = questions().get(question_id)
+    return question["text"] if question else question_id
+
+
+def question_options(question_id):
+    return questions()[question_id].get("options", [])
+
+
+def question_ids(question_type):
+    return [question["id"] for question in load_schema()["questions"] if question["type"] == question_type]
+
+
+def normalize_header(header):
+    return " ".join(re.sub(r"[^\w]+", " ", str(header).casefold()).split())
+
+
+def resolve_headers(headers, cutoff=HEADER_CUTOFF):
+    # Maps sheet headers to question ids: by exact text (or id), then by
+    # text with case, punctuation and spacing ignored, then by the closest
+    # question text. Each question is matched at most once; headers that
+    # match nothing keep their name.
+    known = questions()
+    exact = {question["text"]: question_id for question_id, question in known.items()}
+    exact.update((question_id, question_id) for question_id in known)
+    normalized = {normalize_header(question["text"]): question_id for question_id, question in known.items()}
+
+    mapping, unresolved = {}, []
+    for header in headers:
+        question_id = exact.get(header) or normalized.get(normalize_header(header))
+        if question_id is None or question_id in mapping.values():
+            unresolved.append(header)
+        else:
+            mapping[header] = question_id
+
+    remaining = {
+        normalize_header(known[question_id]["text"]): question_id
+        for question_id in known
+        if question_id not in mapping.values()
+    }
+    for header in unresolved:
+        match = difflib.get_close_matches(normalize_header(header), list(remaining), n=1, cutoff=cutoff)
+        if match:
+            mapping[header] = remaining.pop(match[0])
+    return mapping
+
+
+def apply_schema(df):
+    # Sheet columns renamed to question ids
+    return df.rename(columns=resolve_headers(df.columns))
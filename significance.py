@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from estimates import question_matrix
+
+# Family-wise significance level after correction
+ALPHA = 0.05
+
+
+def group_matrix(column):
+    # One-hot matrix of the respondents' groups; respondents without a
+    # group have an all-zero row
+    codes, groups = pd.factorize(column)
+    matrix = np.eye(len(groups) + 1, len(groups), dtype=np.float32)[codes]
+    return list(groups), matrix
+
+
+def chi_square(observed):
+    # Pearson statistics of a stack of contingency tables (tests x groups x
+    # answers); groups and answers without respondents do not count towards
+    # the degrees of freedom
+    rows = observed.sum(axis=2, keepdims=True)
+    columns = observed.sum(axis=1, keepdims=True)
+    total = rows.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expected = rows * columns / total
+        terms = np.where(expected > 0, (observed - expected) ** 2 / expected, 0)
+    dof = ((rows[:, :, 0] > 0).sum(axis=1) - 1) * ((columns[:, 0, :] > 0).sum(axis=1) - 1)
+    return terms.sum(axis=(1, 2)), dof
+
+
+def adjust_pvalues(pvalues, method="fdr_bh"):
+    # Benjamini-Hochberg false discovery rate, or Holm's family-wise
+    # correction
+    m = len(pvalues)
+    order = np.argsort(pvalues)
+    ranked = pvalues[order]
+    if method == "holm":
+        adjusted = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    else:
+        adjusted = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    result = np.empty(m)
+    result[order] = np.minimum(adjusted, 1)
+    return result
+
+
+def compare_groups(df, charts, group_column, method="fdr_bh", alpha=ALPHA):
+    # Tests every pie, bar and multi-select question for differences between
+    # the groups of group_column: one chi-square test of independence per
+    # single-select question and one per option of a multi-select question
+    # (the two-proportion test when there are two groups). Returns the
+    # significant results after correction, largest difference in shares
+    # first.
+    # scipy takes a second to import; only loaded once a comparison is asked for
+    from scipy.special import chdtrc
+
+    groups, membership = group_matrix(df[group_column])
+    tables, rows = [], []
+    for chart in charts:
+        if chart["kind"] not in ("pie", "bar", "mbar") or chart.get("column") == group_column:
+            continue
+        matrix = question_matrix(df, chart)
+        if matrix is None:
+            continue
+        answers, x, answered = matrix[:3]
+        # Respondents per group and answer, and per group; groups where
+        # nobody answered the question are left out
+        counts = membership.T @ x
+        respondents = membership.T @ answered.astype(np.float32)
+        present = respondents > 0
+        if present.sum() < 2:
+            continue
+        counts, respondents = counts[present], respondents[present]
+        names = [group for group, keep in zip(groups, present) if keep]
+        shares = counts.astype(float) / respondents[:, None] * 100
+
+        if chart["kind"] == "mbar":
+            # Chose the option or not, one test per option
+            tested = list(range(len(answers)))
+            tables.extend(np.stack([counts[:, j], respondents - counts[:, j]], axis=1) for j in tested)
+        else:
+            # The answer whose share differs most between groups
+            tested = [int(np.argmax(shares.max(axis=0) - shares.min(axis=0)))]
+            tables.append(counts)
+
+        for j in tested:
+            high, low = int(np.argmax(shares[:, j])), int(np.argmin(shares[:, j]))
+            rows.append(
+                {
+                    "Question": chart["title"],
+                    "Answer": answers[j],
+                    "Highest group": names[high],
+                    "Highest %": shares[high, j],
+                    "Lowest group": names[low],
+                    "Lowest %": shares[low, j],
+                    "Difference (pp)": shares[high, j] - shares[low, j],
+                }
+            )
+
+    columns = ["Question", "Answer", "Highest group", "Highest %", "Lowest group", "Lowest %",
+               "Difference (pp)", "Chi-square", "df", "p", "Adjusted p"]
+    if not tables:
+        return pd.DataFrame(columns=columns)
+
+    # Pad the tables to one shape so every statistic is computed at once
+    shape = max(table.shape[0] for table in tables), max(table.shape[1] for table in tables)
+    observed = np.zeros((len(tables),) + shape)
+    for i, table in enumerate(tables):
+        observed[i, :table.shape[0], :table.shape[1]] = table
+    statistics, dof = chi_square(observed)
+
+    valid = dof > 0
+    pvalues = np.ones(len(tables))
+    pvalues[valid] = chdtrc(dof[valid], statistics[valid])
+    adjusted = np.ones(len(tables))
+    adjusted[valid] = adjust_pvalues(pvalues[valid], method)
+
+    results = pd.DataFrame([row for row, ok in zip(rows, valid) if ok], columns=columns[:7])
+    results["Chi-square"] = statistics[valid]
+    results["df"] = dof[valid]
+    results["p"] = pvalues[valid]
+    results["Adjusted p"] = adjusted[valid]
+    results = results[results["Adjusted p"] < alpha]
+    return results.sort_values("Difference (pp)", ascending=False).round(
+        {"Highest %": 1, "Lowest %": 1, "Difference (pp)": 1, "Chi-square": 2}
+    ).reset_index(drop=True)[columns]
@@ -0,0 +1,130 @@
+import hashlib
+import json
+
+import pandas as pd
+
+from schema import apply_schema
+
+# Sidebar filters: (key, label, question id)
+FILTERS = [
+    ("gender", "Please select Gender", "sex"),
+    ("age", "Please select Age_group", "age_group"),
+    ("nationality", "Please select Nationality", "citizenship"),
+    ("legal", "Please select Legal Status", "legal_status"),
+    ("ethnic", "Please select Ethnicity", "ethnicity"),
+    ("accomodation", "Please select Accommodation", "settlement"),
+]
+
+
+def sheet_csv_url(sheet_id):
+    # A full URL is used as is, e.g. a local stand-in for the export
+    if sheet_id.startswith(("http://", "https://")):
+        return sheet_id
+    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
+
+
+def load_sheet(sheet_id):
+    # Columns are renamed to the schema's question ids
+    return apply_schema(pd.read_csv(sheet_csv_url(sheet_id)))
+
+
+def categorize(df):
+    # Store the filter columns as categoricals so filtering compares integer
+    # codes; categories keep the order of first appearance
+    df = df.copy()
+    for _, _, column in FILTERS:
+        if column in df.columns:
+            df[column] = pd.Categorical(df[column], categories=df[column].dropna().unique())
+    return df
+
+
+def filter_index(df):
+    # Respondent counts for every combination of filter values in the data,
+    # in order of first appearance. Filter options and cascading counts are
+    # computed from this instead of rescanning the sheet.
+    columns = [column for _, _, column in FILTERS]
+    return df.groupby(columns, dropna=False, observed=True, sort=False).size().reset_index(name="count")
+
+
+def filter_options(index):
+    # Every value of each filter column, in order of first appearance
+    return {key: list(index[column].unique()) for key, _, column in FILTERS}
+
+
+def cascade_counts(index, selections):
+    # For each filter, the respondents per value among rows that match the
+    # selections of the other filters
+    counts = {}
+    for key, _, column in FILTERS:
+        mask = pd.Series(True, index=index.index)
+        for other, _, other_column in FILTERS:
+            if other != key and other in selections:
+                mask &= index[other_column].isin(selections[other])
+        counts[key] = index[mask].groupby(column, dropna=False, observed=True, sort=False)["count"].sum()
+    return counts
+
+
+def filter_mask(df, selections):
+    # selections maps filter keys to the allowed values; filters that are
+    # left out keep every value
+    mask = pd.Series(True, index=df.index)
+    for key, _, column in FILTERS:
+        if key in selections:
+            mask &= df[column].isin(selections[key])
+    return mask
+
+
+def apply_filters(df, selections):
+    return df[filter_mask(df, selections)]
+
+
+def canonical_selections(selections, options):
+    # Filters that keep every value are left out, so selections that show
+    # the same rows are equal (and filter nothing)
+    return {
+        key: values
+        for key, values in selections.items()
+        if key not in options or set(map(str, values)) != set(map(str, options[key]))
+    }
+
+
+def view_hash(selections):
+    # Short id of a view, independent of the order of keys and values
+    canonical = {
+        key: sorted(map(str, values)) if isinstance(values, list) else str(values)
+        for key, values in selections.items()
+    }
+    return hashlib.sha1(json.dumps(canonical, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def view_params(selections):
+    # URL query parameters of a view: one value per filter value, and the
+    # view's hash; the default view has none
+    params = {
+        key: [str(value) for value in values] if isinstance(values, list) else [str(values)]
+        for key, values in selections.items()
+    }
+    if params:
+        params["view"] = [view_hash(selections)]
+    return params
+
+
+def params_values(params, key, options):
+    # The options named in the query parameters (key -> list of text) for
+    # one filter or the round, in option order; None when not set
+    if key not in params:
+        return None
+    named = set(params[key])
+    return [value for value in options if str(value) in named]
+
+
+def summary_stats(df):
+    household = df["household_size"]
+    return {
+        "total_submissions": len(df),
+        "average_household": round(household.mean(), 1),
+        "max_household": household.max(),
+        "average_children": round(df["children"].mean(), 1),
+        "average_elderly": round(df["elderly"].mean(), 1),
+        "average_age": round(df["age"].mean(), 1),
+    }
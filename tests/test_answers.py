@@ -0,0 +1,54 @@
+from answers import AnswerParser
+
+GBV_HELP = ["Police", "Hotline", "Shelter for survivors", "No", "Prefer not to answer", "Other"]
+MEN_RISKS = [
+    "Finding employment opportunities",
+    "Legal issues (documentation, residency permits, etc.)",
+    "Language barriers",
+    "Other (please specify)",
+]
+INFO_RELIABLE = ["Yes", "No", "Not sure"]
+
+
+def test_no_is_not_a_prefix_match():
+    parser = AnswerParser(INFO_RELIABLE)
+    assert parser.parse("Not sure") == (["Not sure"], [])
+    assert parser.parse("No") == (["No"], [])
+    assert parser.parse("No, Not sure") == (["No", "Not sure"], [])
+
+
+def test_write_in_starting_with_an_option_is_free_text():
+    parser = AnswerParser(GBV_HELP)
+    assert parser.parse("Police, Nowhere to go") == (["Police"], ["Nowhere to go"])
+
+
+def test_option_containing_the_delimiter():
+    parser = AnswerParser(MEN_RISKS)
+    response = "Language barriers, Legal issues (documentation, residency permits, etc.), Finding employment opportunities"
+    assert parser.parse(response) == (
+        ["Language barriers", "Legal issues (documentation, residency permits, etc.)", "Finding employment opportunities"],
+        [],
+    )
+
+
+def test_free_text_with_commas_is_one_write_in():
+    parser = AnswerParser(MEN_RISKS)
+    matched, free_text = parser.parse("Language barriers, rent, food, and transport")
+    assert matched == ["Language barriers"]
+    assert free_text == ["rent, food, and transport"]
+    assert parser.options_for("Language barriers, rent, food") == ["Language barriers", "Other (please specify)"]
+
+
+def test_count_weights_responses_and_counts_write_ins():
+    parser = AnswerParser(MEN_RISKS)
+    counts = parser.count(["Language barriers, my own answer", "Language barriers", "my own answer"], [2, 3, 1])
+    assert counts["Language barriers"] == 5
+    assert counts["Other (please specify)"] == 3
+    assert counts.attrs["write_ins"] == 1
+
+
+def test_count_without_other_option_has_no_write_ins():
+    parser = AnswerParser(INFO_RELIABLE)
+    counts = parser.count(["Yes, something else", "No"], [1, 1])
+    assert counts.tolist() == [1, 1, 0]
+    assert "write_ins" not in counts.attrs
@@ -0,0 +1,102 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from data_sources import MultiSheetSource, concat_sheets
+
+SHEETS = {
+    "/north.csv": "timestamp,sex,age\n05/01/2024 10:00:00,Female,30\n05/01/2024 11:00:00,Male,41\n",
+    "/south.csv": "timestamp,sex,age\n05/02/2024 09:00:00,Male,25\n",
+}
+
+
+@pytest.fixture
+def server():
+    # Local stand-in for the sheet exports. Sheets whose path is in
+    # server.validators send an ETag and answer If-None-Match with 304; the
+    # others send the whole sheet every time, like the Google export.
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = server.sheets[self.path].encode()
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            validated = self.path in server.validators
+            if validated and self.headers.get("If-None-Match") == etag:
+                server.log.append((self.path, 304))
+                self.send_response(304)
+                self.end_headers()
+                return
+            server.log.append((self.path, 200))
+            self.send_response(200)
+            if validated:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.sheets = dict(SHEETS)
+    server.validators = {"/north.csv"}
+    server.log = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = lambda path: f"http://127.0.0.1:{server.server_port}{path}"
+    yield server
+    server.shutdown()
+
+
+def source(server):
+    return MultiSheetSource([server.url(path) for path in SHEETS])
+
+
+def test_sheets_are_combined_in_order(server):
+    df = source(server).load()
+    assert len(df) == 3
+    assert df["age"].tolist() == [30, 41, 25]
+
+
+def test_unchanged_sheet_with_etag_is_not_downloaded_again(server):
+    multi = source(server)
+    multi.load()
+    server.log.clear()
+    multi.refresh()
+    multi.load()
+    assert ("/north.csv", 304) in server.log
+
+
+def test_unchanged_content_keeps_the_parsed_frame(server):
+    multi = source(server)
+    multi.load()
+    south = multi.sheets[server.url("/south.csv")]["frame"]
+    multi.refresh()
+    multi.load()
+    # Downloaded again (no validators), but not parsed again
+    assert ("/south.csv", 200) in server.log
+    assert multi.sheets[server.url("/south.csv")]["frame"] is south
+
+
+def test_refresh_keeps_the_combined_frame_until_a_sheet_changes(server):
+    multi = source(server)
+    first = multi.load()
+    multi.refresh()
+    assert multi.load() is first
+
+    server.sheets["/south.csv"] += "05/03/2024 08:00:00,Female,52\n"
+    multi.refresh()
+    changed = multi.load()
+    assert changed is not first
+    assert changed["age"].tolist() == [30, 41, 25, 52]
+
+
+def test_concat_sheets_aligns_columns_in_schema_order():
+    north = pd.DataFrame({"age": [30], "sex": ["Female"], "extra": ["x"]})
+    south = pd.DataFrame({"sex": ["Male"], "timestamp": ["05/02/2024 09:00:00"]})
+    df = concat_sheets([north, south])
+    assert list(df.columns) == ["timestamp", "sex", "age", "extra"]
+    assert df["sex"].tolist() == ["Female", "Male"]
+    assert df["age"].isna().tolist() == [False, True]
+    assert df["timestamp"].isna().tolist() == [True, False]
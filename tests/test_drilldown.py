@@ -0,0 +1,40 @@
+import pandas as pd
+
+from drilldown import RespondentIndex, page_rows
+
+CHART = dict(key="seeing_bar", kind="bar", column="dif_seeing", title="Seeing")
+
+
+def sheet(answers, sexes):
+    return pd.DataFrame({"dif_seeing": answers, "sex": sexes})
+
+
+def test_lookup_applies_the_filters():
+    index = RespondentIndex([CHART])
+    index.update(sheet(["Yes", "No", "Yes"], ["Female", "Male", "Male"]))
+    rows, positions = index.lookup("seeing_bar", "Yes", {"gender": ["Male"]})
+    assert positions.tolist() == [2]
+    assert page_rows(rows, positions, 1)["sex"].tolist() == ["Male"]
+
+
+def test_appended_rows_are_indexed():
+    index = RespondentIndex([CHART])
+    index.update(sheet(["Yes", "No"], ["Female", "Male"]))
+    index.update(sheet(["Yes", "No", "Yes"], ["Female", "Male", "Male"]))
+    assert index.lookup("seeing_bar", "Yes", {})[1].tolist() == [0, 2]
+
+
+def test_edited_answer_moves_the_respondent():
+    index = RespondentIndex([CHART])
+    index.update(sheet(["Yes", "No", "Yes"], ["Female", "Male", "Male"]))
+    index.update(sheet(["No", "No", "Yes"], ["Female", "Male", "Male"]))
+    assert index.lookup("seeing_bar", "Yes", {})[1].tolist() == [2]
+    assert index.lookup("seeing_bar", "No", {})[1].tolist() == [0, 1]
+
+
+def test_pages():
+    index = RespondentIndex([CHART])
+    index.update(sheet(["Yes"] * 5, ["Female"] * 5))
+    rows, positions = index.lookup("seeing_bar", "Yes", {})
+    assert len(page_rows(rows, positions, 2, page_rows=2)) == 2
+    assert len(page_rows(rows, positions, 3, page_rows=2)) == 1
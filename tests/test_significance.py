@@ -0,0 +1,60 @@
+import numpy as np
+from scipy.stats import chi2_contingency
+
+from significance import adjust_pvalues, chi_square
+
+TABLES = [
+    np.array([[10, 20, 30], [25, 15, 5]]),
+    np.array([[12, 8], [9, 11], [20, 4]]),
+    np.array([[5, 5], [5, 5]]),
+]
+
+
+def test_chi_square_matches_scipy():
+    for table in TABLES:
+        statistic, dof = chi_square(table[None].astype(float))
+        expected = chi2_contingency(table, correction=False)
+        assert np.isclose(statistic[0], expected.statistic)
+        assert dof[0] == expected.dof
+
+
+def test_zero_padded_tables_keep_their_statistics():
+    # Tables of different shapes are padded with empty groups and answers
+    # to be tested in one batch
+    observed = np.zeros((len(TABLES), 3, 3))
+    for i, table in enumerate(TABLES):
+        observed[i, :table.shape[0], :table.shape[1]] = table
+    statistics, dof = chi_square(observed)
+    for i, table in enumerate(TABLES):
+        expected = chi2_contingency(table, correction=False)
+        assert np.isclose(statistics[i], expected.statistic)
+        assert dof[i] == expected.dof
+
+
+def test_empty_answer_does_not_count_towards_dof():
+    statistic, dof = chi_square(np.array([[[10.0, 0, 20], [20, 0, 10]]]))
+    expected = chi2_contingency(np.array([[10, 20], [20, 10]]), correction=False)
+    assert np.isclose(statistic[0], expected.statistic)
+    assert dof[0] == 1
+
+
+def test_benjamini_hochberg():
+    pvalues = np.array([0.01, 0.04, 0.03, 0.20])
+    # Sorted 0.01, 0.03, 0.04, 0.20 times 4/rank: 0.04, 0.06, 0.0533, 0.20;
+    # then the running minimum from the largest rank down
+    expected = np.array([0.04, 0.0533333, 0.0533333, 0.20])
+    assert np.allclose(adjust_pvalues(pvalues, "fdr_bh"), expected)
+
+
+def test_holm():
+    pvalues = np.array([0.01, 0.04, 0.03, 0.20])
+    # Sorted 0.01, 0.03, 0.04, 0.20 times 4, 3, 2, 1: 0.04, 0.09, 0.08, 0.20;
+    # then the running maximum from the smallest rank up
+    expected = np.array([0.04, 0.09, 0.09, 0.20])
+    assert np.allclose(adjust_pvalues(pvalues, "holm"), expected)
+
+
+def test_adjusted_pvalues_are_capped_at_one():
+    pvalues = np.array([0.5, 0.6, 0.9])
+    assert adjust_pvalues(pvalues, "holm").max() == 1
+    assert adjust_pvalues(pvalues, "fdr_bh").max() <= 1
@@ -0,0 +1,38 @@
+import numpy as np
+
+from survey import canonical_selections, params_values, view_hash, view_params
+
+OPTIONS = {"gender": ["Female", "Male"], "ethnic": ["Roma", "Gagauz", np.nan]}
+
+
+def test_view_hash_ignores_the_order_of_filters_and_values():
+    first = {"gender": ["Female"], "ethnic": ["Roma", "Gagauz"]}
+    second = {"ethnic": ["Gagauz", "Roma"], "gender": ["Female"]}
+    assert view_hash(first) == view_hash(second)
+    assert view_hash(first) != view_hash({"gender": ["Male"], "ethnic": ["Roma", "Gagauz"]})
+
+
+def test_filters_keeping_every_value_are_dropped():
+    selections = {"gender": ["Male", "Female"], "ethnic": ["Roma"]}
+    assert canonical_selections(selections, OPTIONS) == {"ethnic": ["Roma"]}
+    every = {"gender": ["Female", "Male"], "ethnic": [np.nan, "Gagauz", "Roma"]}
+    assert canonical_selections(every, OPTIONS) == {}
+    assert view_hash(canonical_selections(every, OPTIONS)) == view_hash({})
+
+
+def test_selections_round_trip_through_the_url():
+    selections = {"gender": ["Female"], "ethnic": [np.nan, "Roma"], "round": "2024-05"}
+    params = view_params(selections)
+    assert params["view"] == [view_hash(selections)]
+    restored = {key: params_values(params, key, OPTIONS[key]) for key in OPTIONS}
+    assert restored["gender"] == ["Female"]
+    assert restored["ethnic"][0] == "Roma" and np.isnan(restored["ethnic"][1])
+    assert params_values(params, "round", ["2024-05", "2024-11"]) == ["2024-05"]
+
+
+def test_unknown_url_values_are_ignored():
+    params = {"gender": ["Female", "Robot"], "ethnic": ["Atlantean"]}
+    assert params_values(params, "gender", OPTIONS["gender"]) == ["Female"]
+    assert params_values(params, "ethnic", OPTIONS["ethnic"]) == []
+    assert params_values(params, "legal", ["Refugee"]) is None
+    assert view_params({}) == {}
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from survey import FILTERS
+from trends import TrendStore, submission_days
+
+CHART_KEY = "able_to_access_healthservice_need_pie"
+
+
+def sheet(timestamps, answers):
+    df = pd.DataFrame({"timestamp": timestamps, "healthcare_access": answers})
+    return df.assign(**{column: "Any" for _, _, column in FILTERS})
+
+
+def test_other_locale_is_read_day_first():
+    days = submission_days(pd.Series(["05/01/2024 13:37:00", "13.05.2024 10:00:00", "not a date"]))
+    assert days.tolist()[:2] == [pd.Timestamp("2024-05-01"), pd.Timestamp("2024-05-13")]
+    assert pd.isna(days.iloc[2])
+
+
+def test_configured_format():
+    store = TrendStore(timestamp_format="%d.%m.%Y %H:%M:%S")
+    store.update(sheet(["02.05.2024 10:00:00", "03.05.2024 10:00:00"], ["Yes", "No"]))
+    trend = store.trend(CHART_KEY, {})
+    assert sorted(trend["period"].dt.day) == [2, 3]
+    assert store.undated == 0
+
+
+def test_undated_sheet_has_no_trend():
+    store = TrendStore()
+    store.update(sheet(["someday", "never"], ["Yes", "No"]))
+    assert store.undated == 2
+    assert store.trend(CHART_KEY, {}) is None
+
+
+def test_edited_answer_is_recounted():
+    store = TrendStore()
+    store.update(sheet(["05/01/2024 10:00:00", "05/01/2024 11:00:00"], ["Yes", "No"]))
+    store.update(sheet(["05/01/2024 10:00:00", "05/01/2024 11:00:00", "05/02/2024 09:00:00"], ["No", "No", "Yes"]))
+    counts = store.trend(CHART_KEY, {}).groupby("answer")["count"].sum()
+    assert counts.to_dict() == {"No": 2, "Yes": 1}
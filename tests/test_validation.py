@@ -0,0 +1,30 @@
+import pandas as pd
+
+from validation import Validator
+
+
+def sheet(ages):
+    return pd.DataFrame({"age": ages, "age_group": ["18-35"] * len(ages)})
+
+
+def test_new_rows_are_validated_incrementally():
+    validator = Validator()
+    validator.update(sheet([20, 25]))
+    validator.update(sheet([20, 25, 200]))
+    report = validator.report()
+    assert report.loc[report["Check"] == "Outside 0-120", "Example rows"].tolist() == ["4"]
+
+
+def test_fixed_row_leaves_the_report():
+    validator = Validator()
+    validator.update(sheet([20, 200, 25]))
+    assert "Outside 0-120" in validator.report()["Check"].tolist()
+    validator.update(sheet([20, 30, 25]))
+    assert validator.report().empty
+
+
+def test_deleted_rows_start_over():
+    validator = Validator()
+    validator.update(sheet([20, 200, 25]))
+    validator.update(sheet([20]))
+    assert validator.report().empty
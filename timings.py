@@ -0,0 +1,15 @@
+import time
+from contextlib import contextmanager
+
+# Import and first-load times of this server process, in seconds; each
+# stage keeps the time of its first (cold) run
+STARTUP = {}
+
+
+@contextmanager
+def timed(timings, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.setdefault(stage, time.perf_counter() - start)
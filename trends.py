@@ -0,0 +1,110 @@
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from charts import CHARTS, match_options
+from survey import FILTERS, apply_filters
+from validation import edited, row_hashes
+
+# Google Forms writes the submission time as e.g. "05/01/2024 13:37:00";
+# timestamp_format in the secrets overrides it for sheets in another locale
+TIMESTAMP_COLUMN = "timestamp"
+TIMESTAMP_FORMAT = "%m/%d/%Y %H:%M:%S"
+
+# Questions with a trend view: urgent needs, future plans, healthcare access
+TREND_CHARTS = ["urgent_need_bar", "plans_bar", "able_to_access_healthservice_need_pie"]
+
+# Trend bins; weeks start on Monday
+BINS = {"Day": "D", "Week": "W"}
+
+
+def submission_days(column, format=TIMESTAMP_FORMAT):
+    # Timestamps that do not match the format (e.g. "01.05.2024 13:37:00"
+    # from a sheet exported in another locale) get a format inferred from
+    # the first of them, day first; what still fails is NaT
+    days = pd.to_datetime(column, format=format, errors="coerce")
+    other = days.isna() & column.notna()
+    inferred = guess_datetime_format(str(column[other].iloc[0]), dayfirst=True) if other.any() else None
+    if inferred:
+        days[other] = pd.to_datetime(column[other], format=inferred, errors="coerce")
+    return days.dt.floor("D")
+
+
+class TrendStore:
+    # Respondents per day, filter values and answer for the trend questions.
+    # update() only aggregates the rows added since the last call and adds
+    # them to the running totals, so a refreshed sheet never rescans
+    # history; a row deleted or edited since starts over. Filters and weekly
+    # bins are applied to the totals.
+    def __init__(self, charts=TREND_CHARTS, timestamp_format=TIMESTAMP_FORMAT):
+        self.charts = [chart for chart in CHARTS if chart["key"] in charts]
+        self.timestamp_format = timestamp_format
+        self.keys = ["day"] + [column for _, _, column in FILTERS]
+        self.reset()
+
+    def reset(self):
+        self.rows = 0
+        self.aggregated = row_hashes(pd.DataFrame())
+        # Rows whose timestamp could not be read; they are left out
+        self.undated = 0
+        self.answers = {}
+        self.respondents = {}
+
+    def columns(self):
+        # Sheet columns the store reads
+        return [TIMESTAMP_COLUMN] + [column for _, _, column in FILTERS] + [chart["column"] for chart in self.charts]
+
+    def update(self, df):
+        if TIMESTAMP_COLUMN not in df.columns:
+            return
+        # Only edits to the columns the store reads matter
+        aggregated = row_hashes(df[[column for column in self.columns() if column in df.columns]])
+        if edited(aggregated, self.aggregated):
+            self.reset()
+        new = df.iloc[self.rows:]
+        if new.empty:
+            return
+
+        days = submission_days(new[TIMESTAMP_COLUMN], self.timestamp_format)
+        self.undated += int((days.isna() & new[TIMESTAMP_COLUMN].notna()).sum())
+        keys = new[self.keys[1:]].astype(object).assign(day=days)[self.keys]
+        for chart in self.charts:
+            if chart["column"] not in new.columns:
+                continue
+            responses = new[chart["column"]].dropna()
+            if chart["kind"] == "mbar":
+                # Parse each distinct response once
+                matches = {response: match_options(response, chart["options"]) for response in responses.unique()}
+                answers = responses.map(matches).explode().dropna()
+            else:
+                answers = responses
+            self.add(self.answers, chart["key"], keys.loc[answers.index].assign(answer=answers.values))
+            self.add(self.respondents, chart["key"], keys.loc[responses.index])
+
+        self.rows = len(df)
+        self.aggregated = aggregated
+
+    def add(self, totals, key, rows):
+        # Running totals plus the counts of the new rows
+        columns = list(rows.columns)
+        counts = rows.groupby(columns, dropna=False, sort=False).size().reset_index(name="count")
+        if key in totals:
+            counts = pd.concat([totals[key], counts], ignore_index=True)
+            counts = counts.groupby(columns, dropna=False, sort=False)["count"].sum().reset_index()
+        totals[key] = counts
+
+    def trend(self, chart_key, selections, bin="Day"):
+        # Respondents per bin and answer for the selected filters, with the
+        # share of the bin's respondents who answered the question
+        if chart_key not in self.answers:
+            return None
+        answers = apply_filters(self.answers[chart_key], selections)
+        respondents = apply_filters(self.respondents[chart_key], selections)
+        period = lambda frame: frame["day"].dt.to_period(BINS[bin]).dt.start_time
+        # Undated rows drop out of the groupby
+        counts = answers.groupby([period(answers), "answer"])["count"].sum().rename_axis(["period", "answer"])
+        if counts.empty:
+            return None
+        totals = respondents.groupby(period(respondents))["count"].sum().rename("respondents").rename_axis("period")
+        trend = counts.reset_index().merge(totals.reset_index(), on="period")
+        trend["share"] = trend["count"] / trend["respondents"] * 100
+        return trend
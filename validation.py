@@ -0,0 +1,169 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from answers import parser_for
+from charts import CHARTS
+
+AGE_COLUMN = "age"
+AGE_GROUP_COLUMN = "age_group"
+HOUSEHOLD_COLUMN = "household_size"
+CHILDREN_COLUMN = "children"
+ELDERLY_COLUMN = "elderly"
+TIMESTAMP_COLUMN = "timestamp"
+
+# Plausible values of the numeric questions (inclusive)
+NUMERIC_RANGES = {
+    AGE_COLUMN: (0, 120),
+    HOUSEHOLD_COLUMN: (1, 30),
+    CHILDREN_COLUMN: (0, 30),
+    ELDERLY_COLUMN: (0, 30),
+}
+
+# Not compared when looking for duplicates: the submission time and the
+# round store's bookkeeping columns
+IGNORED_COLUMNS = [TIMESTAMP_COLUMN, "round_id", "row_id"]
+
+# Row numbers listed per issue in the report
+EXAMPLE_ROWS = 5
+
+# Row hashes: each column's hash is folded in as hash * multiplier + value
+# (wrapping at 64 bits), with a fixed value for missing answers
+HASH_MULTIPLIER = np.uint64(0x100000001B3)
+MISSING_HASH = np.uint64(0x9E3779B97F4A7C15)
+
+
+def age_group_bounds(group):
+    # "18-35" -> (18, 35), "60+" -> (60, inf); None for other labels
+    match = re.fullmatch(r"\s*(\d+)\s*-\s*(\d+)\s*", str(group))
+    if match:
+        return int(match[1]), int(match[2])
+    match = re.fullmatch(r"\s*(\d+)\s*\+\s*", str(group))
+    if match:
+        return int(match[1]), np.inf
+    return None
+
+
+def row_checks(df):
+    # (check, column, mask of failing rows) for every check that applies to
+    # the sheet; each check is a vectorized comparison over the rows
+    checks = []
+    numbers = {}
+    for column, (low, high) in NUMERIC_RANGES.items():
+        if column not in df.columns:
+            continue
+        values = pd.to_numeric(df[column], errors="coerce")
+        numbers[column] = values
+        checks.append(("Not a number", column, df[column].notna() & values.isna()))
+        checks.append((f"Outside {low}-{high}", column, (values < low) | (values > high)))
+
+    if {HOUSEHOLD_COLUMN, CHILDREN_COLUMN, ELDERLY_COLUMN} <= numbers.keys():
+        members = numbers[CHILDREN_COLUMN].fillna(0) + numbers[ELDERLY_COLUMN].fillna(0)
+        checks.append(
+            ("More children and elderly than household members", HOUSEHOLD_COLUMN, members > numbers[HOUSEHOLD_COLUMN])
+        )
+
+    if AGE_COLUMN in numbers and AGE_GROUP_COLUMN in df.columns:
+        groups = df[AGE_GROUP_COLUMN].astype(object)
+        bounds = {group: age_group_bounds(group) for group in groups.dropna().unique()}
+        low = groups.map(lambda group: (bounds.get(group) or (-np.inf, np.inf))[0]).astype(float)
+        high = groups.map(lambda group: (bounds.get(group) or (-np.inf, np.inf))[1]).astype(float)
+        age = numbers[AGE_COLUMN]
+        checks.append(("Age group does not match age", AGE_GROUP_COLUMN, (age < low) | (age > high)))
+
+    for chart in CHARTS:
+        if chart["kind"] != "mbar" or chart["column"] not in df.columns:
+            continue
+        parser = parser_for(chart["options"])
+        if parser.other is not None:
+            # Free text is a write-in counted under Other
+            continue
+        # Answers outside the option list are not counted anywhere
+        responses = df[chart["column"]]
+        unknown = {response: bool(parser.parse(response)[1]) for response in responses.dropna().unique()}
+        checks.append(("Answer not in the option list", chart["column"], responses.map(unknown).fillna(False).astype(bool)))
+    return checks
+
+
+class Validator:
+    # Data-quality issues of the sheet. Like trends.TrendStore, update()
+    # only checks the rows added since the last call: row checks depend on
+    # the row alone, and duplicates are found through the hashes of every
+    # row seen so far. A row deleted or edited since (e.g. fixed after the
+    # report flagged it) starts over.
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.rows = 0
+        self.validated = row_hashes(pd.DataFrame())
+        self.issues = {}
+        self.hashes = set()
+
+    def update(self, df):
+        # No check reads the ignored columns, so the answers' hashes find
+        # both edited rows and duplicates
+        validated = row_hashes(df.drop(columns=IGNORED_COLUMNS, errors="ignore"))
+        if edited(validated, self.validated):
+            self.reset()
+        new = df.iloc[self.rows:]
+        if new.empty:
+            return
+
+        # Sheet row numbers: the header is row 1
+        numbers = np.arange(self.rows, len(df)) + 2
+        for check, column, mask in row_checks(new):
+            self.add(check, column, numbers[mask.to_numpy()])
+
+        # Identical answers to every question
+        hashes = pd.Series(validated[self.rows:])
+        duplicate = hashes.duplicated() | hashes.isin(self.hashes)
+        self.add("Duplicate submission", "", numbers[duplicate.to_numpy()])
+        self.hashes.update(hashes)
+
+        self.rows = len(df)
+        self.validated = validated
+
+    def add(self, check, column, rows):
+        if len(rows):
+            self.issues.setdefault((check, column), []).extend(rows.tolist())
+
+    def report(self):
+        return pd.DataFrame(
+            [
+                {
+                    "Check": check,
+                    "Column": column,
+                    "Rows": len(rows),
+                    "Example rows": ", ".join(map(str, rows[:EXAMPLE_ROWS])),
+                }
+                for (check, column), rows in self.issues.items()
+            ],
+            columns=["Check", "Column", "Rows", "Example rows"],
+        ).sort_values("Rows", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def row_hashes(df):
+    # One hash per row. A column's distinct values are hashed once: sheets
+    # repeat a handful of answers over thousands of rows.
+    hashes = np.zeros(len(df), dtype="uint64")
+    for position in range(df.shape[1]):
+        codes, uniques = pd.factorize(df.iloc[:, position])
+        # Code -1 (missing) picks the appended MISSING_HASH
+        values = np.append(pd.util.hash_array(np.asarray(uniques, dtype=object)), MISSING_HASH)[codes]
+        hashes *= HASH_MULTIPLIER
+        hashes += values
+    return hashes
+
+
+def edited(hashes, seen):
+    # Whether rows seen before were deleted or changed: the sheet may only
+    # grow at the bottom
+    return len(hashes) < len(seen) or not np.array_equal(hashes[:len(seen)], seen)
+
+
+def validate(df):
+    validator = Validator()
+    validator.update(df)
+    return validator.report()
@@ -0,0 +1,111 @@
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+from answers import parser_for
+
+# Share of character trigrams two write-ins must have in common (Jaccard)
+# to be grouped as the same answer
+SIMILARITY = 0.6
+
+
+def normalize(text):
+    # Case, accents, punctuation and spacing do not make a different answer;
+    # non-Latin scripts are kept as they are
+    text = unicodedata.normalize("NFKD", str(text).casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[\W_]+", " ", text).split())
+
+
+def fingerprint(text):
+    # Word order and repeated words do not matter either
+    return " ".join(sorted(set(normalize(text).split())))
+
+
+def trigrams(key):
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class WriteInClusters:
+    # Groups the free text typed into a question's "Other" option. Texts are
+    # assigned once: add() skips every text it has already seen, so a
+    # refreshed sheet only costs the new answers. The first text of a
+    # cluster is its reference; later texts join the most similar cluster
+    # above the threshold, found through an inverted trigram index. One
+    # instance is shared by every session (st.cache_resource), so add() and
+    # top() hold a lock while they read or grow the clusters.
+    def __init__(self, similarity=SIMILARITY):
+        self.similarity = similarity
+        # Reentrant: top() calls add() while holding it
+        self.lock = threading.RLock()
+        self.cluster_of = {}
+        self.by_fingerprint = {}
+        self.grams = []
+        self.index = defaultdict(set)
+
+    def add(self, texts):
+        with self.lock:
+            for text in texts:
+                if text in self.cluster_of:
+                    continue
+                key = fingerprint(text)
+                if not key:
+                    continue
+                cluster = self.by_fingerprint.get(key)
+                if cluster is None:
+                    cluster = self.closest(trigrams(key))
+                    if cluster is None:
+                        cluster = self.new_cluster(trigrams(key))
+                    self.by_fingerprint[key] = cluster
+                self.cluster_of[text] = cluster
+
+    def closest(self, grams):
+        shared = Counter(cluster for gram in grams for cluster in self.index.get(gram, ()))
+        best, best_score = None, self.similarity
+        for cluster, common in shared.items():
+            score = common / (len(grams) + len(self.grams[cluster]) - common)
+            if score >= best_score:
+                best, best_score = cluster, score
+        return best
+
+    def new_cluster(self, grams):
+        cluster = len(self.grams)
+        self.grams.append(grams)
+        for gram in grams:
+            self.index[gram].add(cluster)
+        return cluster
+
+    def top(self, counts, n=10):
+        # counts maps write-in texts to respondents. Each cluster is labelled
+        # with its most common spelling.
+        with self.lock:
+            self.add(counts.index)
+            counts = counts[counts.index.isin(self.cluster_of.keys())]
+            if counts.empty:
+                return pd.DataFrame(columns=["Answer", "Respondents", "Variants"])
+            counts = counts.sort_values(ascending=False)
+            labels = counts.index.map(self.cluster_of)
+        clusters = counts.groupby(labels, sort=False)
+        table = pd.DataFrame(
+            {
+                "Answer": clusters.apply(lambda group: group.index[0]),
+                "Respondents": clusters.sum(),
+                "Variants": clusters.size(),
+            }
+        )
+        return table.sort_values("Respondents", ascending=False, kind="stable").head(n).reset_index(drop=True)
+
+
+def write_in_counts(responses, option_list):
+    # Respondents per free-text answer of a multi-select question; each
+    # distinct response is parsed once
+    parser = parser_for(option_list)
+    counts = Counter()
+    for response, weight in responses.dropna().value_counts(sort=False).items():
+        for text in parser.parse(response)[1]:
+            counts[text] += int(weight)
+    return pd.Series(counts, dtype="int64")